@@ -1,10 +1,23 @@
 import streamlit as st
-import pandas as pd
-import subprocess
+import importlib
+import io
+import logging
+import queue
+import uuid
+import atexit
+import threading
 import os
-import glob
+import re
 import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from logging.handlers import QueueHandler
 from pathlib import Path
+from typing import TYPE_CHECKING
+
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+if TYPE_CHECKING:
+    import pyarrow as pa
 
 # Configure the Streamlit page
 st.set_page_config(
@@ -13,101 +26,435 @@ st.set_page_config(
     layout="centered"
 )
 
+# Seconds a remembered output path is trusted before the output directory is rescanned
+OUTPUT_PATH_CACHE_TTL = 60
+
+# Seconds a scrape result is reused when the same query is fetched again
+FETCH_CACHE_TTL = 900
+
+# A US ZIP code is exactly five digits
+_ZIP_RE = re.compile(r"[0-9]{5}")
+
+@st.cache_resource(show_spinner=False)
 def setup_output_directory():
-    """Create output directory if it doesn't exist."""
+    """Create output directory if it doesn't exist, once per server process."""
     Path("output").mkdir(exist_ok=True)
 
-def get_latest_csv(zipcode: str, energy_type: str) -> str:
+def get_latest_output(zipcode: str, energy_type: str) -> str:
     """
-    Find the most recent CSV file for the given zipcode and energy type.
+    Find the most recent Parquet output file for the given zipcode and energy type.
     
     Args:
         zipcode (str): The ZIP code to search for
         energy_type (str): Either 'Electricity' or 'Gas'
     
     Returns:
-        str: Path to the latest CSV file
+        str: Path to the latest output file
+    """
+    # Adding or renaming a file bumps the directory mtime, so keying on it
+    # invalidates the cached scan whenever a scrape lands a new file
+    return _latest_output_cached(zipcode, energy_type, os.stat("output").st_mtime_ns)
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def _latest_output_cached(zipcode: str, energy_type: str, dir_mtime_ns: int) -> str:
+    """
+    Scan the output directory for the latest file, cached per directory mtime.
+    
+    Args:
+        zipcode (str): The ZIP code to search for
+        energy_type (str): Either 'Electricity' or 'Gas'
+        dir_mtime_ns (int): Output directory mtime, used only as a cache key
+    
+    Returns:
+        str: Path to the latest output file
     """
     prefix = "papowerswitch" if energy_type == "Electricity" else "pagasswitch"
-    pattern = f"output/{prefix}_filtered_{zipcode}_*.csv"
-    files = glob.glob(pattern)
+    name_prefix = f"{prefix}_filtered_{zipcode}_"
+    
+    # Single directory pass; each file is written once, so mtime orders them like ctime,
+    # and DirEntry caches its stat result so every candidate costs at most one statx.
+    # In-progress writes are named ".tmp_*" and never match the prefix.
+    with os.scandir("output") as entries:
+        latest = max(
+            (e for e in entries if e.name.startswith(name_prefix) and e.name.endswith(".parquet")),
+            key=lambda e: e.stat().st_mtime_ns,
+            default=None
+        )
     
-    if not files:
-        raise FileNotFoundError(f"No CSV files found for ZIP code {zipcode}")
+    if latest is None:
+        raise FileNotFoundError(f"No output files found for ZIP code {zipcode}")
     
-    return max(files, key=os.path.getctime)
+    return latest.path
 
-def run_scraper(zipcode: str, energy_type: str, headless: bool = True):
+def get_cached_output(zipcode: str, energy_type: str) -> str:
+    """
+    Return the latest output path, reusing the one remembered in the session when it is fresh.
+    
+    Streamlit reruns the whole script on every widget interaction, so this keeps
+    those reruns from rescanning the output directory.
+    
+    Args:
+        zipcode (str): The ZIP code to search for
+        energy_type (str): Either 'Electricity' or 'Gas'
+    
+    Returns:
+        str: Path to the latest output file
+    """
+    cache = st.session_state.setdefault("output_path_cache", {})
+    # headless is part of the key since run_scraper uses a different browser for each mode
+    key = (zipcode, energy_type, headless)
+    
+    cached = cache.get(key)
+    if cached and time.time() - cached[0] < OUTPUT_PATH_CACHE_TTL:
+        return cached[1]
+    
+    path = get_latest_output(zipcode, energy_type)
+    cache[key] = (time.time(), path)
+    return path
+
+@st.cache_data(show_spinner=False)
+def _load_rates(path: str, mtime: float) -> "pa.Table":
+    """
+    Read a Parquet results file, cached so widget reruns don't reload the same file.
+    
+    Args:
+        path (str): Path to the Parquet file
+        mtime (float): Modification time of the file, used only to key the cache
+    
+    Returns:
+        pa.Table: The file contents
+    """
+    # Imported here so page loads and reruns before the first fetch don't pay for it
+    import pyarrow.parquet as pq
+    
+    # Kept as an Arrow table end to end: st.dataframe takes it directly and the
+    # download is written by pyarrow, so the app never converts to pandas
+    return pq.read_table(path)
+
+@st.cache_data(show_spinner=False)
+def _csv_bytes(path: str, mtime: float) -> bytes:
+    """
+    Serialize a results file as CSV for the download button, cached per file version.
+    
+    Args:
+        path (str): Path to the Parquet file
+        mtime (float): Modification time of the file, used only to key the cache
+    
+    Returns:
+        bytes: UTF-8 encoded CSV data
+    """
+    import pyarrow.csv as pa_csv
+    
+    # Write straight to bytes rather than building a str and encoding a second copy
+    buffer = io.BytesIO()
+    pa_csv.write_csv(_load_rates(path, mtime), buffer)
+    return buffer.getvalue()
+
+def _scraper_module(energy_type: str):
+    """
+    Import the scraper module for the given energy type.
+    
+    The import happens on first use and is cached by Python, so subsequent
+    fetches skip the selenium/pandas imports.
+    """
+    module_name = "papowerswitch_export_scraper" if energy_type == "Electricity" else "pagasswitch_export_scraper"
+    return importlib.import_module(module_name)
+
+def _download_dir(energy_type: str) -> str:
+    """
+    Directory the given scraper's browser downloads into.
+    
+    Each energy type gets its own, since both scrapers may run at once and must
+    not pick up each other's export.
+    """
+    subdir = "downloads_power" if energy_type == "Electricity" else "downloads_gas"
+    return os.path.abspath(os.path.join("output", subdir))
+
+def _quit_driver(driver):
+    """Quit a browser, ignoring errors if it is already gone."""
+    try:
+        driver.quit()
+    except Exception:
+        pass
+
+def _driver_alive(driver) -> bool:
+    """Check whether a cached browser still responds; dead ones are quit and replaced."""
+    try:
+        driver.window_handles
+        return True
+    except Exception:
+        _quit_driver(driver)
+        return False
+
+@st.cache_resource(show_spinner=False, validate=_driver_alive)
+def get_driver(energy_type: str, headless: bool):
+    """
+    Start a browser for the given scraper once and reuse it across fetches.
+    
+    Args:
+        energy_type (str): Either 'Electricity' or 'Gas'
+        headless (bool): Whether to run in headless mode
+    
+    Returns:
+        WebDriver: A Chrome driver configured by the scraper module
+    """
+    driver = _scraper_module(energy_type).create_driver(_download_dir(energy_type), headless=headless)
+    atexit.register(_quit_driver, driver)
+    return driver
+
+@st.cache_resource(show_spinner=False)
+def _driver_lock(energy_type: str, headless: bool) -> threading.Lock:
+    """Lock guarding the shared driver, since cached resources are shared by all sessions."""
+    return threading.Lock()
+
+def run_scraper(zipcode: str, energy_type: str, headless: bool = True) -> str:
     """
     Run the appropriate scraper based on energy type.
     
+    The scraper runs in-process on a long-lived browser from get_driver, so only
+    the first fetch pays the browser start-up cost.
+    
+    Args:
+        zipcode (str): The ZIP code to scrape
+        energy_type (str): Either 'Electricity' or 'Gas'
+        headless (bool): Whether to run in headless mode
+    
+    Returns:
+        str: Path to the filtered Parquet file written by the scraper
+    """
+    scraper = _scraper_module(energy_type)
+    
+    with _driver_lock(energy_type, headless):
+        driver = get_driver(energy_type, headless)
+        return scraper.scrape(zipcode, headless=headless, driver=driver, download_dir=_download_dir(energy_type))
+
+@st.cache_resource(show_spinner=False)
+def _in_flight_scrapes() -> tuple:
+    """
+    Scrapes currently running, shared by all sessions.
+    
+    app.py is re-executed on every rerun, so this state lives in a cached
+    resource rather than a module global.
+    
+    Returns:
+        tuple: A lock and a dict mapping (zipcode, energy_type, headless) to a Future
+    """
+    return threading.Lock(), {}
+
+def scrape_once(zipcode: str, energy_type: str, headless: bool = True) -> str:
+    """
+    Run a scrape, or wait for an identical one that is already running.
+    
+    Args:
+        zipcode (str): The ZIP code to scrape
+        energy_type (str): Either 'Electricity' or 'Gas'
+        headless (bool): Whether to run in headless mode
+    
+    Returns:
+        str: Path to the filtered Parquet file written by the scraper
+    """
+    lock, in_flight = _in_flight_scrapes()
+    key = (zipcode, energy_type)
+    
+    with lock:
+        future = in_flight.get(key)
+        is_leader = future is None
+        if is_leader:
+            future = Future()
+            in_flight[key] = future
+    
+    if is_leader:
+        try:
+            future.set_result(run_scraper(zipcode, energy_type, headless))
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            with lock:
+                in_flight.pop(key, None)
+    
+    return future.result()
+
+@st.cache_data(ttl=FETCH_CACHE_TTL, show_spinner=False)
+def fetch_rates(zipcode: str, energy_type: str, headless: bool = True) -> str:
+    """
+    Scrape rates, reusing the result of an identical query from the last 15 minutes.
+    
+    Only the output path is cached; the loaded data is cached by _load_rates, so a
+    repeated query skips both the scrape and the file load.
+    
     Args:
         zipcode (str): The ZIP code to scrape
         energy_type (str): Either 'Electricity' or 'Gas'
         headless (bool): Whether to run in headless mode
+    
+    Returns:
+        str: Path to the filtered Parquet file written by the scraper
+    """
+    return scrape_once(zipcode, energy_type, headless)
+
+@st.fragment
+def render_results(zipcode: str, energy_type: str):
     """
-    script = "papowerswitch_export_scraper.py" if energy_type == "Electricity" else "pagasswitch_export_scraper.py"
-    cmd = ["python", script, "--zipcode", zipcode]
+    Display the latest rates table and a download button for one energy type.
     
-    if headless:
-        cmd.append("--headless")
+    Runs as a fragment, so interacting with its own widgets (the download
+    button) reruns only this block instead of re-serializing every table.
     
-    subprocess.run(cmd, check=True)
+    Args:
+        zipcode (str): The ZIP code that was scraped
+        energy_type (str): Either 'Electricity' or 'Gas'
+    """
+    try:
+        latest_file = get_cached_output(zipcode, energy_type)
+        mtime = os.path.getmtime(latest_file)
+        rates = _load_rates(latest_file, mtime)
+        
+        st.success("✅ Done! Here are the latest rates:")
+        
+        # Display the dataframe with some styling
+        st.dataframe(
+            rates,
+            use_container_width=True,
+            hide_index=True
+        )
+        
+        # Add download button
+        st.download_button(
+            "📥 Download Results",
+            _csv_bytes(latest_file, mtime),
+            file_name=f"energy_rates_{zipcode}_{energy_type.lower()}.csv",
+            mime="text/csv",
+            key=f"download_{energy_type}"
+        )
+    except Exception as e:
+        st.error(f"❌ An error occurred: {str(e)}")
+
+def _drain_progress(progress: queue.Queue, status):
+    """
+    Write any queued scraper log messages into the status panel.
+    
+    Args:
+        progress (queue.Queue): Log records queued by a QueueHandler
+        status: The st.status panel to write to
+    """
+    while True:
+        try:
+            record = progress.get_nowait()
+        except queue.Empty:
+            return
+        
+        message = record.getMessage()
+        status.update(label=f"🔍 {message}")
+        status.write(message)
 
 def main():
     # Create output directory
     setup_output_directory()
     
+    # Latest output paths resolved during this session, keyed by (zipcode, energy_type)
+    output_path_cache = st.session_state.setdefault("output_path_cache", {})
+    
     # App title and description
     st.title("⚡ PA Energy Rate Finder")
     st.markdown("""
     Find the best energy rates in Pennsylvania by entering your ZIP code below.
-    Choose between electricity or gas rates, and we'll fetch the latest prices for you.
+    Choose electricity, gas, or both, and we'll fetch the latest prices for you.
     """)
     
     # Input fields
     col1, col2 = st.columns(2)
     with col1:
-        zipcode = st.text_input("Enter ZIP Code (PA only):", "")
+        zipcode = st.text_input("Enter ZIP Code (PA only):", "").strip()
     with col2:
-        energy_type = st.radio("Select Energy Type:", ["Electricity", "Gas"])
+        energy_type = st.radio("Select Energy Type:", ["Electricity", "Gas", "Both"])
     
+    energy_types = ["Electricity", "Gas"] if energy_type == "Both" else [energy_type]
     headless = st.checkbox("Run in headless mode", True)
     
     # Fetch rates button
-    if st.button("Fetch Rates", type="primary"):
-        if not zipcode.strip():
-            st.warning("⚠️ Please enter a ZIP code.")
-        else:
-            try:
-                with st.spinner("🔍 Scraping rates in progress..."):
-                    # Run the scraper
-                    run_scraper(zipcode, energy_type, headless)
-                    
-                    # Get and display results
-                    latest_file = get_latest_csv(zipcode, energy_type)
-                    df = pd.read_csv(latest_file)
-                    
-                    st.success("✅ Done! Here are the latest rates:")
-                    
-                    # Display the dataframe with some styling
-                    st.dataframe(
-                        df,
-                        use_container_width=True,
-                        hide_index=True
-                    )
-                    
-                    # Add download button
-                    st.download_button(
-                        "📥 Download Results",
-                        df.to_csv(index=False),
-                        file_name=f"energy_rates_{zipcode}_{energy_type.lower()}.csv",
-                        mime="text/csv"
-                    )
-                    
-            except Exception as e:
-                st.error(f"❌ An error occurred: {str(e)}")
-                st.info("Please make sure you have the required scraper scripts installed and try again.")
+    fetch_requested = st.button("Fetch Rates", type="primary")
+    if fetch_requested and not _ZIP_RE.fullmatch(zipcode):
+        # Reject typos up front rather than after a slow, doomed scrape
+        st.warning("⚠️ Please enter a valid 5-digit ZIP code.")
+        fetch_requested = False
+    
+    if fetch_requested:
+        # Forget any remembered paths so the fresh exports are picked up
+        for etype in energy_types:
+            output_path_cache.pop((zipcode, etype), None)
+        shown_types = energy_types
+    else:
+        # Show results on every rerun (e.g. after a download click), not only right after a fetch
+        shown_types = [etype for etype in energy_types if (zipcode, etype) in output_path_cache]
+    
+    if not shown_types:
+        return
+    
+    # Progress panel sits above the results while a fetch is running
+    status = st.status("🔍 Scraping rates in progress...") if fetch_requested else None
+    
+    containers = st.tabs(shown_types) if len(shown_types) > 1 else [st.container()]
+    panels = dict(zip(shown_types, containers))
+    
+    if not fetch_requested:
+        for etype in shown_types:
+            with panels[etype]:
+                render_results(zipcode, etype)
+        return
+    
+    # Import the scrapers up front; their module loggers propagate to the root logger hooked below
+    for etype in energy_types:
+        _scraper_module(etype)
+    
+    # Forward this fetch's scraper log records to the status panel. Only records from
+    # our worker threads are kept, since other sessions may be scraping at the same time.
+    progress = queue.Queue()
+    thread_prefix = f"fetch-{uuid.uuid4().hex[:8]}"
+    log_handler = QueueHandler(progress)
+    log_handler.addFilter(lambda record: record.threadName.startswith(thread_prefix))
+    root_logger = logging.getLogger()
+    root_logger.addHandler(log_handler)
+    
+    failed = False
+    try:
+        # Each energy type has its own browser and the work is I/O bound, so "Both"
+        # scrapes electricity and gas concurrently and shows each as soon as it is done.
+        # The workers get this script run's context, which the cached functions they
+        # call (fetch_rates, get_driver, _driver_lock) need.
+        with ThreadPoolExecutor(
+            max_workers=len(energy_types),
+            thread_name_prefix=thread_prefix,
+            initializer=add_script_run_ctx,
+            initargs=(None, get_script_run_ctx()),
+        ) as executor:
+            futures = {executor.submit(fetch_rates, zipcode, etype, headless): etype for etype in energy_types}
+            pending = set(futures)
+            
+            while pending:
+                done, pending = wait(pending, timeout=0.25, return_when=FIRST_COMPLETED)
+                _drain_progress(progress, status)
+                
+                for future in done:
+                    etype = futures[future]
+                    with panels[etype]:
+                        try:
+                            # Remember the new export's path for this session
+                            output_path_cache[(zipcode, etype)] = (time.time(), future.result())
+                        except Exception as e:
+                            failed = True
+                            st.error(f"❌ An error occurred: {str(e)}")
+                            st.info("Please make sure you have the required scraper scripts installed and try again.")
+                            continue
+                        
+                        render_results(zipcode, etype)
+    finally:
+        root_logger.removeHandler(log_handler)
+    
+    _drain_progress(progress, status)
+    if failed:
+        status.update(label="❌ Scraping finished with errors", state="error")
+    else:
+        status.update(label="✅ Scraping finished", state="complete")
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,49 @@
+"""
+Output file writing shared by the PA Power Switch and PA Gas Switch scrapers.
+"""
+
+import os
+
+
+def _to_arrow_table(df):
+    """
+    Convert a DataFrame to an Arrow table for writing, storing NaN as null.
+
+    pd.to_numeric(errors='coerce') leaves NaN in Arrow-backed float columns, which
+    would otherwise be written as the text 'nan' rather than an empty field.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    for i, field in enumerate(table.schema):
+        if pa.types.is_floating(field.type):
+            column = table.column(i)
+            table = table.set_column(i, field, pc.if_else(pc.is_nan(column), None, column))
+    return table
+
+def write_output_atomically(df, path, output_format='csv'):
+    """
+    Write a DataFrame to a temporary file and rename it into place.
+
+    The rename is atomic, so anything watching the output directory only ever
+    sees complete files.
+    """
+    tmp_path = os.path.join(os.path.dirname(path), f".tmp_{os.getpid()}_{os.path.basename(path)}")
+    try:
+        table = _to_arrow_table(df)
+        with open(tmp_path, 'wb') as f:
+            if output_format == 'parquet':
+                import pyarrow.parquet as pq
+                pq.write_table(table, f, compression='snappy')
+            else:
+                # Unlike the unquoted to_csv output this replaced, pyarrow's CSV writer
+                # puts double quotes around the header names and every string value
+                import pyarrow.csv as pa_csv
+                pa_csv.write_csv(table, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
@@ -8,12 +8,24 @@ clicks the "Export Offer to CSV" button, and processes the downloaded file.
 import os
 import sys
 import time
+import base64
 import csv
+import json
+import queue
+import atexit
+import shutil
 import logging
+import multiprocessing.util
 import argparse
+import numpy as np
 import pandas as pd
+import requests
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from functools import partial
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
@@ -21,25 +33,371 @@ from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support.ui import Select
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from selenium.common.exceptions import TimeoutException, NoSuchElementException, StaleElementReferenceException, WebDriverException
+
+from output_writer import write_output_atomically
 
 # Create output directory if it doesn't exist
 output_dir = 'output'
 os.makedirs(output_dir, exist_ok=True)
 
-# Set up logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
+def _start_log_listener():
+    """Start a fresh queue and listener thread feeding the log handlers"""
+    global _log_listener
+    _log_queue_handler.queue = queue.SimpleQueue()
+    _log_listener = QueueListener(_log_queue_handler.queue, *_log_handlers, respect_handler_level=True)
+    _log_listener.start()
+
+def _restart_log_listener_in_child():
+    """Give a forked worker its own listener, drained when the worker exits"""
+    _start_log_listener()
+    # Pool workers leave through os._exit, which skips atexit but runs multiprocessing finalizers
+    multiprocessing.util.Finalize(None, _log_listener.stop, exitpriority=10)
+
+# Set up this module's logger with its own handlers, leaving the root logger to the
+# application (records still propagate to it, which is how the app shows progress).
+# Log calls only enqueue the record; a listener thread does the file and stdout writes.
+logger = logging.getLogger(__name__)
+if not logger.handlers:
+    _formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    _log_handlers = [
         logging.FileHandler(os.path.join(output_dir, "pagasswitch_export_scraper.log")),
         logging.StreamHandler(sys.stdout)
     ]
-)
+    for _handler in _log_handlers:
+        _handler.setFormatter(_formatter)
+    
+    _log_queue_handler = QueueHandler(queue.SimpleQueue())
+    logger.addHandler(_log_queue_handler)
+    logger.setLevel(logging.INFO)
+    
+    _start_log_listener()
+    atexit.register(lambda: _log_listener.stop())
+    # A forked pool worker inherits the handler but not the listener thread (Windows
+    # has no fork, and spawned workers set up logging afresh on import)
+    if hasattr(os, 'register_at_fork'):
+        os.register_at_fork(after_in_child=_restart_log_listener_in_child)
+
+# URL patterns the browser skips when asset blocking is on; only the form DOM and the CSV matter
+BLOCKED_ASSET_URLS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg",
+    "*.woff", "*.woff2", "*.ttf", "*.mp4",
+    "*/analytics*", "*googletagmanager*"
+]
+
+def build_chrome_options(download_dir, headless=True, block_assets=False, profile_dir=None):
+    """Build the Chrome options used by the scraper"""
+    chrome_options = Options()
+    if headless:
+        chrome_options.add_argument("--headless=new")
+    
+    # Return from driver.get at DOMContentLoaded; the explicit waits cover the elements we need
+    chrome_options.page_load_strategy = 'eager'
+    
+    # A persistent profile keeps the HTTP cache warm between runs (one browser per profile at a time)
+    if profile_dir:
+        chrome_options.add_argument(f"--user-data-dir={os.path.abspath(profile_dir)}")
+        chrome_options.add_argument("--profile-directory=Default")
+        chrome_options.add_argument("--disk-cache-size=268435456")
+    
+    # Window size and display settings (a fixed size keeps the layout the same headless or not)
+    chrome_options.add_argument("--window-size=1920,1080")
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    
+    # Skip background work a scraping session never needs
+    chrome_options.add_argument("--disable-background-networking")
+    chrome_options.add_argument("--disable-sync")
+    chrome_options.add_argument("--disable-default-apps")
+    chrome_options.add_argument("--disable-translate")
+    chrome_options.add_argument("--disable-component-extensions-with-background-pages")
+    chrome_options.add_argument("--mute-audio")
+    chrome_options.add_argument("--no-first-run")
+    chrome_options.add_argument("--no-default-browser-check")
+    chrome_options.add_argument("--metrics-recording-only")
+    # The pages need neither media playback nor WebGL
+    chrome_options.add_argument("--autoplay-policy=user-gesture-required")
+    chrome_options.add_argument("--disable-webgl")
+    if block_assets:
+        chrome_options.add_argument("--blink-settings=imagesEnabled=false")
+    
+    # Disable various features that might interfere
+    chrome_options.add_argument("--disable-extensions")
+    chrome_options.add_argument("--disable-popup-blocking")
+    chrome_options.add_argument("--disable-blink-features=AutomationControlled")
+    chrome_options.add_argument("--disable-web-security")
+    chrome_options.add_argument("--allow-running-insecure-content")
+    
+    # Set download preferences
+    prefs = {
+        "download.default_directory": download_dir,
+        "download.prompt_for_download": False,
+        "download.directory_upgrade": True,
+        "safebrowsing.enabled": True,
+        # Disable PDF viewer
+        "plugins.always_open_pdf_externally": True,
+        # Disable save password prompt
+        "credentials_enable_service": False,
+        "profile.password_manager_enabled": False,
+        # Disable notifications
+        "profile.default_content_setting_values.notifications": 2,
+        # Enable JavaScript
+        "profile.default_content_settings.javascript": 1,
+        # Enable images unless asset blocking is on (the managed setting is the one Chrome
+        # enforces; the default one only seeds a new profile)
+        "profile.default_content_settings.images": 2 if block_assets else 1,
+        "profile.managed_default_content_settings.images": 2 if block_assets else 1,
+        # Enable cookies
+        "profile.default_content_settings.cookies": 1
+    }
+    chrome_options.add_experimental_option("prefs", prefs)
+    
+    # Exclude the "enable-automation" flag
+    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    
+    # Record page events (not network traffic) in the performance log; the download
+    # events in it tell the scraper the moment an export has finished
+    chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    chrome_options.add_experimental_option("perfLoggingPrefs", {"enableNetwork": False, "enablePage": True})
+    
+    # Set up user agent to mimic a real browser
+    chrome_options.add_argument("user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/134.0.0.0 Safari/537.36")
+    
+    return chrome_options
+
+def create_driver(download_dir, headless=True, block_assets=False, profile_dir=None):
+    """
+    Start Chrome with the scraper's options and timeouts.
+    
+    Pass the result as the scraper's driver argument to reuse one browser across runs.
+    With block_assets, images, fonts, media and trackers are never fetched. With
+    profile_dir, Chrome keeps its profile (and HTTP cache) there across runs.
+    """
+    # keep_alive reuses one HTTP connection to chromedriver for every command instead of
+    # reconnecting each time (Selenium's default, but relied on here so spelled out)
+    driver = webdriver.Chrome(options=build_chrome_options(download_dir, headless, block_assets, profile_dir), keep_alive=True)
+    
+    if block_assets:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_ASSET_URLS})
+    
+    # Allow downloads into download_dir with progress events, headless or not
+    try:
+        driver.execute_cdp_cmd("Browser.setDownloadBehavior", {
+            "behavior": "allow",
+            "downloadPath": os.path.abspath(download_dir),
+            "eventsEnabled": True
+        })
+    except WebDriverException as e:
+        logger.warning(f"Could not set download behavior, relying on download preferences: {e}")
+    
+    # Set page load timeout and script timeout (a stuck load gives up sooner so a retry can start)
+    driver.set_page_load_timeout(30)
+    driver.set_script_timeout(60)
+    
+    return driver
+
+def read_export_csv(csv_path):
+    """
+    Read an exported CSV with pyarrow's multithreaded parser into Arrow-backed columns.
+    
+    Only named columns are parsed, since the blank-header 'Unnamed' columns are dropped
+    anyway. Falls back to pandas' own parser if pyarrow is unavailable or rejects the file.
+    """
+    header = pd.read_csv(csv_path, nrows=0).columns
+    usecols = [col for col in header if not col.startswith('Unnamed')]
+    try:
+        df = pd.read_csv(csv_path, engine='pyarrow', usecols=usecols, dtype_backend='pyarrow')
+    except (ImportError, ValueError) as e:
+        logger.warning(f"Reading CSV with pyarrow failed ({e}), using the default parser")
+        return pd.read_csv(csv_path, usecols=usecols)
+    
+    # A column blank in every row (often More info) comes back as null[pyarrow], which
+    # has no .str methods and rejects fillna(''); read it as an empty text column instead
+    null_columns = {col: 'string[pyarrow]' for col, dtype in df.dtypes.items() if str(dtype) == 'null[pyarrow]'}
+    return df.astype(null_columns) if null_columns else df
+
+def _xp_text_contains(tag, *texts):
+    """
+    Locator for a tag whose own text contains all of the given strings.
+    
+    Text matching is the one thing CSS selectors can't do, so these are the only XPath
+    lookups; everything else uses the browser's native CSS selector engine.
+    """
+    conditions = " and ".join(f"contains(text(), '{text}')" for text in texts)
+    return (By.XPATH, f"//{tag}[{conditions}]")
+
+# Locators, in one place so a change on the site means editing only this table
+# Shop page
+LOC_ZIPCODE = (By.ID, "edit-zipcode")
+LOC_ZIPCODE_BY_NAME = (By.NAME, "zipcode")
+LOC_ZIPCODE_INPUT = (By.CSS_SELECTOR, "input#edit-zipcode, input[name=zipcode]")
+LOC_ANY_FORM = (By.TAG_NAME, "form")
+LOC_SHOP_HEADING = _xp_text_contains("h1", "Shop", "Natural Gas")
+LOC_SUBMIT = (By.ID, "edit-submit-residential-rate-search2")
+LOC_SUBMIT_IN_ZIPCODE_FORM = (By.CSS_SELECTOR, "form:has(#edit-zipcode, input[name=zipcode]) :is(input, button)[type=submit]")
+LOC_ANY_SUBMIT = (By.CSS_SELECTOR, "input[type=submit], button[type=submit]")
+# Results page
+LOC_AJAX_PROGRESS = (By.CSS_SELECTOR, ".ajax-progress")
+LOC_FILTER_INPUTS = (By.CSS_SELECTOR, "input[type=radio], input[type=checkbox]")
+LOC_EXPORT_BUTTON_TEXT = _xp_text_contains("button", "Export")
+LOC_EXPORT_BUTTON_CLASS = (By.CSS_SELECTOR, "button[class*=export]")
+LOC_EXPORT_CSV_TEXT = _xp_text_contains("*[self::a or self::button]", "Export", "CSV")
+LOC_EXPORT_CSV_ATTR = (By.CSS_SELECTOR, ":is(a, button):is([class*=export], [id*=export])")
+LOC_CSV_LINK = (By.CSS_SELECTOR, "a[href*=csv], a[href*=CSV]")
+
+# Alternatives tried together for one lookup, most specific first
+SHOP_PAGE_LOCATORS = (LOC_ZIPCODE, LOC_ZIPCODE_BY_NAME, LOC_ANY_FORM)
+SUBMIT_LOCATORS = (LOC_SUBMIT, LOC_SUBMIT_IN_ZIPCODE_FORM, LOC_ANY_SUBMIT)
+RESULTS_PAGE_LOCATORS = (LOC_EXPORT_BUTTON_TEXT, LOC_EXPORT_BUTTON_CLASS)
+EXPORT_LOCATORS = (LOC_EXPORT_CSV_TEXT, LOC_EXPORT_CSV_ATTR, LOC_CSV_LINK)
+# How each export locator is described in the log
+EXPORT_MATCH_NAMES = ('text', 'class/ID', 'href')
+
+# Scroll to, focus, clear and fill an input, firing the events a user's typing would
+FILL_INPUT_JS = """
+    const el = arguments[0];
+    el.scrollIntoView(true);
+    el.focus();
+    el.value = '';
+    el.value = arguments[1];
+    el.dispatchEvent(new Event('input', {bubbles: true}));
+    el.dispatchEvent(new Event('change', {bubbles: true}));
+"""
+
+# Scroll an element into view and click it
+SCROLL_AND_CLICK_JS = "arguments[0].scrollIntoView(true); arguments[0].click();"
+
+# Try (By.XPATH / By.CSS_SELECTOR, value) locators in order in the page and return
+# [element, index of the locator that matched], or null if none match
+FIRST_MATCH_JS = """
+    const locators = arguments[0];
+    for (let i = 0; i < locators.length; i++) {
+        const [by, value] = locators[i];
+        const el = by === 'xpath'
+            ? document.evaluate(value, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue
+            : document.querySelector(value);
+        if (el) return [el, i];
+    }
+    return null;
+"""
+
+# JavaScript helper prepended to the filter scripts: the text of the label tied to a
+# form control (sibling label, wrapping label, or label[for]). A control without a
+# label reports its parent's text instead, unless noFallback is passed.
+LABEL_TEXT_JS = """
+    function labelText(el, noFallback) {
+        const isLabel = n => n && n.tagName === 'LABEL';
+        const label = [el.nextElementSibling, el.previousElementSibling].find(isLabel)
+            || el.closest('label')
+            || (el.id && document.querySelector(`label[for="${el.id}"]`));
+        if (label) return label.textContent.trim();
+        return noFallback ? '' : (el.parentElement ? el.parentElement.textContent.trim() : '');
+    }
+"""
+
+# Filters applied on the results page
+FILTERS = {
+    # The Fixed Price checkbox, by ID or else by a label containing all of these words
+    "fixed_price_ids": ["edit-field-type-value-fixed"],
+    "fixed_price_words": ["fixed", "price"],
+    # Term Length option (the first option is used if there is none by this name)
+    "term_length_option": "Any",
+    # Terms & Conditions checkboxes, by label
+    "checkbox_labels": ["No Cancellation Fee", "No Deposit Required", "No Monthly Fee"],
+    # Rate schedule option ("R - Regular Residential Service")
+    "select_option_contains": "Regular Residential Service"
+}
+
+# Apply FILTERS (passed as arguments[0]) in the browser. Controls are set without firing
+# events, then one change event per form lets an auto-submitting form re-render once with
+# every filter in place. Returns [[name, 'selected' | 'already' | 'missing', detail], ...]
+# and the number of forms that changed. Needs LABEL_TEXT_JS prepended.
+BATCH_FILTER_JS = """
+    const spec = arguments[0];
+    const boxes = [...document.querySelectorAll('input[type=checkbox]')];
+    const selects = [...document.querySelectorAll('select')];
+    const report = [];
+    const changed = new Map();
+    
+    function check(name, input, detail) {
+        if (!input) return report.push([name, 'missing', null]);
+        if (input.checked) return report.push([name, 'already', null]);
+        input.checked = true;
+        changed.set(input.form || document, input);
+        report.push([name, 'selected', detail || null]);
+    }
+    
+    function choose(name, select, index) {
+        if (select.selectedIndex === index) return report.push([name, 'already', null]);
+        select.selectedIndex = index;
+        changed.set(select.form || document, select);
+        report.push([name, 'selected', select.options[index].text]);
+    }
+    
+    // 1. Fixed Price checkbox
+    check('Fixed Price', spec.fixed_price_ids.map(id => document.getElementById(id)).find(Boolean)
+        || boxes.find(c => {
+            const text = labelText(c).toLowerCase();
+            return spec.fixed_price_words.every(w => text.includes(w));
+        }));
+    
+    // 2. Term Length: a dropdown labelled for it (or listing months), else a radio button
+    const term = selects.find(s => {
+        const text = labelText(s, true).toLowerCase();
+        if (text) return text.includes('term') && text.includes('length');
+        return [...s.options].some(o => o.text.toLowerCase().includes('month'));
+    });
+    if (term) {
+        const index = [...term.options].findIndex(o => o.text.trim() === spec.term_length_option);
+        choose('Term Length', term, Math.max(index, 0));
+    } else {
+        check('Term Length', [...document.querySelectorAll('input[type=radio]')]
+            .find(r => labelText(r).includes(spec.term_length_option)), spec.term_length_option);
+    }
+    
+    // 3. Terms & Conditions checkboxes, by exact label text first, then by all of its words
+    for (const condition of spec.checkbox_labels) {
+        const words = condition.toLowerCase().split(' ');
+        check(condition, boxes.find(c => labelText(c).includes(condition))
+            || boxes.find(c => {
+                const text = labelText(c).toLowerCase();
+                return text && words.every(w => text.includes(w));
+            }));
+    }
+    
+    // 4. Rate schedule: the option in the dropdown labelled for it, or else in any dropdown,
+    //    found in one pass over the options; failing that, the input a label names
+    const target = spec.select_option_contains;
+    const labelled = selects.find(s => /Rate Schedule|Service Type/.test(labelText(s)));
+    const options = labelled ? [...labelled.options] : [...document.querySelectorAll('select option')];
+    const option = options.find(o => o.text.trim() === 'R - ' + target)
+        || options.find(o => o.text.includes(target));
+    if (option) {
+        choose('Rate Schedule', option.closest('select'), option.index);
+    } else if (labelled) {
+        report.push(['Rate Schedule', 'missing', null]);
+    } else {
+        // Go from the label carrying the text to its input (by its for attribute, inside
+        // it, or next to it); only without one are the inputs' own labels checked one by one
+        const isInput = n => n && n.tagName === 'INPUT' ? n : null;
+        const label = [...document.querySelectorAll('label')].find(l => l.textContent.includes(target));
+        const labelInput = label && (isInput(label.htmlFor && document.getElementById(label.htmlFor))
+            || label.querySelector('input')
+            || isInput(label.previousElementSibling) || isInput(label.nextElementSibling));
+        check('Rate Schedule', labelInput
+            || [...document.querySelectorAll('input')].find(i => labelText(i).includes(target)), target);
+    }
+    
+    for (const control of changed.values()) {
+        control.dispatchEvent(new Event('change', {bubbles: true}));
+    }
+    return [report, changed.size];
+"""
 
 class PAGasSwitchExportScraper:
-    def __init__(self, output_dir='output', headless=False, download_dir=None, max_retries=3, retry_delay=5):
+    def __init__(self, output_dir='output', headless=True, download_dir=None, max_retries=3, retry_delay=5, driver=None, output_format='csv', block_assets=False, debug=False, profile_dir=None, download_timeout=60):
         # URL for the shop page
         self.shop_url = "https://www.pagasswitch.com/shop-for-natural-gas"
         
@@ -57,738 +415,554 @@ class PAGasSwitchExportScraper:
         # Timestamp for output files
         self.timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         
-        # Retry settings
-        self.max_retries = max_retries
-        self.retry_delay = retry_delay
+        # Format of the filtered output: 'csv' or 'parquet'
+        self.output_format = output_format
         
-        # Set up Selenium
-        chrome_options = Options()
-        if headless:
-            chrome_options.add_argument("--headless=new")
+        # Path of the filtered file written by the last successful run
+        self.filtered_path = None
         
-        # Window size and display settings
-        chrome_options.add_argument("--window-size=1920,1080")
-        chrome_options.add_argument("--start-maximized")
-        chrome_options.add_argument("--disable-gpu")
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
+        # Capture screenshots and page source at every step, not only when a step fails
+        self.debug = debug
         
-        # Disable various features that might interfere
-        chrome_options.add_argument("--disable-extensions")
-        chrome_options.add_argument("--disable-popup-blocking")
-        chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-        chrome_options.add_argument("--disable-web-security")
-        chrome_options.add_argument("--allow-running-insecure-content")
+        # Seconds to wait for the exported CSV to finish downloading
+        self.download_timeout = download_timeout
         
-        # Set download preferences
-        prefs = {
-            "download.default_directory": self.download_dir,
-            "download.prompt_for_download": False,
-            "download.directory_upgrade": True,
-            "safebrowsing.enabled": True,
-            # Disable PDF viewer
-            "plugins.always_open_pdf_externally": True,
-            # Disable save password prompt
-            "credentials_enable_service": False,
-            "profile.password_manager_enabled": False,
-            # Disable notifications
-            "profile.default_content_setting_values.notifications": 2,
-            # Enable JavaScript
-            "profile.default_content_settings.javascript": 1,
-            # Enable images
-            "profile.default_content_settings.images": 1,
-            # Enable cookies
-            "profile.default_content_settings.cookies": 1
-        }
-        chrome_options.add_experimental_option("prefs", prefs)
+        # Export link seen by the last browser run, as (url parts, query pairs, index of the
+        # zipcode pair), and an HTTP session carrying the browser's cookies; see _fast_fetch
+        self._export_template = None
+        self._http = None
         
-        # Exclude the "enable-automation" flag
-        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+        # Path of the CSV the last download produced, handed from the export step to process_csv_file
+        self._latest_csv_path = None
         
-        # Set up user agent to mimic a real browser
-        chrome_options.add_argument("user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/134.0.0.0 Safari/537.36")
-        
-        # Initialize the Chrome driver
-        self.driver = webdriver.Chrome(options=chrome_options)
+        # Retry settings
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
         
-        # Set page load timeout and script timeout
-        self.driver.set_page_load_timeout(60)
-        self.driver.set_script_timeout(60)
+        # Browser settings, used when the scraper starts its own Chrome
+        self.headless = headless
+        self.block_assets = block_assets
+        self.profile_dir = profile_dir
         
-        # Set up WebDriverWait with a longer timeout
-        self.wait = WebDriverWait(self.driver, 30)
+        # Use the caller's driver if given (e.g. one kept alive across runs), otherwise
+        # start our own on first use so constructing the scraper stays cheap
+        self.owns_driver = driver is None
+        self.driver = driver
+        if driver is not None:
+            self._setup_waits()
         
         # Log initialization
-        logging.info("Chrome browser initialized with the following options:")
-        logging.info(f"Headless mode: {headless}")
-        logging.info(f"Download directory: {self.download_dir}")
-        logging.info(f"Output directory: {self.output_dir}")
-        logging.info(f"Window size: 1920x1080")
-        logging.info(f"Wait timeout: 30 seconds")
+        logger.info("Chrome browser configured with the following options:")
+        logger.info(f"Headless mode: {headless}")
+        logger.info(f"Asset blocking: {block_assets}")
+        logger.info(f"Chrome profile: {profile_dir or 'temporary'}")
+        logger.info(f"Download directory: {self.download_dir}")
+        logger.info(f"Output directory: {self.output_dir}")
+        logger.info(f"Window size: 1920x1080")
+        logger.info(f"Wait timeout: 30 seconds")
     
-    def __del__(self):
-        """Clean up resources"""
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def _setup_waits(self):
+        """Create the explicit waits for the current driver"""
+        # Waits are tiered by how long the awaited change usually takes, and poll far more
+        # often than the 500ms default since most conditions turn true almost at once
+        self.wait = WebDriverWait(self.driver, 30, poll_frequency=0.1, ignored_exceptions=(NoSuchElementException, StaleElementReferenceException))
+        # Clickability of elements already on the page
+        self.fast_wait = WebDriverWait(self.driver, 5, poll_frequency=0.05)
+        # Page loads and form submissions
+        self.nav_wait = WebDriverWait(self.driver, 60, poll_frequency=0.25)
+    
+    def _ensure_driver(self):
+        """Start Chrome if this scraper doesn't have a browser yet"""
+        if self.driver is None:
+            self.driver = create_driver(self.download_dir, self.headless, self.block_assets, self.profile_dir)
+            self._setup_waits()
+            logger.info("Chrome browser started")
+    
+    def _browser_alive(self):
+        """Whether the browser still answers commands"""
+        try:
+            self.driver.window_handles
+            return True
+        except WebDriverException:
+            return False
+    
+    def close(self):
+        """Quit the browser unless it belongs to the caller"""
+        if not self.owns_driver or self.driver is None:
+            return
+        
+        driver, self.driver = self.driver, None
         try:
-            if hasattr(self, 'driver'):
-                self.driver.quit()
+            driver.quit()
+            logger.info("Browser closed")
         except Exception as e:
-            logging.error(f"Error closing browser: {e}")
+            logger.error(f"Error closing browser: {e}")
+        finally:
+            # Don't leave chromedriver behind if quit() failed part way
+            process = getattr(driver.service, 'process', None)
+            if process is not None and process.poll() is None:
+                logger.warning(f"Killing leftover chromedriver process {process.pid}")
+                process.kill()
     
     def navigate_to_shop_page(self):
         """Navigate to the shop page"""
-        logging.info("Navigating to shop page")
+        logger.info("Navigating to shop page")
         
         try:
             # Navigate to the shop page
             self.driver.get(self.shop_url)
             
-            # Wait for the page to fully load
-            time.sleep(5)  # Give the page more time to fully initialize
-            
-            # Wait for the page to load (look for the zip code input field)
-            try:
-                # Wait for the element to be present
-                self.wait.until(EC.presence_of_element_located((By.ID, "edit-zipcode")))
-                logging.info("Shop page loaded successfully (found zipcode field by ID)")
-            except TimeoutException:
-                # Try alternative selectors if the zipcode field isn't found
-                try:
-                    self.wait.until(EC.presence_of_element_located((By.NAME, "zipcode")))
-                    logging.info("Shop page loaded successfully (found zipcode field by name)")
-                except TimeoutException:
-                    # Check if any form is present
-                    self.wait.until(EC.presence_of_element_located((By.TAG_NAME, "form")))
-                    logging.info("Shop page loaded successfully (found form)")
+            # Wait for the page to load (the zip code input field, or at least a form)
+            locator, _ = self._find_first(SHOP_PAGE_LOCATORS, self.nav_wait)
+            logger.info(f"Shop page loaded successfully (found {locator[1]})")
             
             # Check if the page title contains expected text
             if "Shop for Natural Gas" in self.driver.title:
-                logging.info(f"Page title confirms we're on the shop page: {self.driver.title}")
+                logger.info(f"Page title confirms we're on the shop page: {self.driver.title}")
             else:
-                logging.warning(f"Unexpected page title: {self.driver.title}")
+                logger.warning(f"Unexpected page title: {self.driver.title}")
             
-            # Save screenshot for debugging
-            self.save_screenshot("shop_page")
-            
-            # Save page source for debugging
-            self.save_page_source("shop_page")
+            # Save screenshot and page source for debugging
+            if self.debug:
+                self.save_screenshot("shop_page")
+                self.save_page_source("shop_page")
             
             # Check if we're on the correct page by looking for key elements
             try:
                 # Look for elements that should be on the shop page
-                page_heading = self.driver.find_element(By.XPATH, "//h1[contains(text(), 'Shop') and contains(text(), 'Natural Gas')]")
-                logging.info(f"Found page heading: {page_heading.text}")
+                page_heading = self.driver.find_element(*LOC_SHOP_HEADING)
+                logger.info(f"Found page heading: {page_heading.text}")
             except NoSuchElementException:
-                logging.warning("Could not find expected page heading")
+                logger.warning("Could not find expected page heading")
             
             return True
         except Exception as e:
-            logging.error(f"Error navigating to shop page: {e}")
+            logger.error(f"Error navigating to shop page: {e}")
             self.save_screenshot("shop_page_error")
             self.save_page_source("shop_page_error")
             return False
     
+    def _find_first(self, locators, wait=None, clickable=False):
+        """
+        Wait until any of the locators matches and return (locator, element).
+        
+        All alternatives are checked on every poll, in order of preference, so a missing
+        first choice no longer costs a full timeout before the next one is tried. With
+        clickable, only a visible and enabled match counts, as with element_to_be_clickable.
+        """
+        def first_match(driver):
+            for locator in locators:
+                elements = driver.find_elements(*locator)
+                try:
+                    if elements and (not clickable or (elements[0].is_displayed() and elements[0].is_enabled())):
+                        return locator, elements[0]
+                except StaleElementReferenceException:
+                    # The form re-rendered between the find and the check; look again next poll
+                    return False
+            return False
+        
+        return (wait or self.wait).until(first_match)
+    
     def enter_zipcode(self, zipcode):
         """Enter the zipcode and submit the form"""
-        logging.info(f"Entering zipcode: {zipcode}")
+        logger.info(f"Entering zipcode: {zipcode}")
         
         try:
-            # Wait for the page to fully load
-            time.sleep(3)  # Give the page a moment to fully initialize
-            
-            # Find the specific zipcode input field identified by the user
+            # Wait for the zipcode input (by ID or name in one query) to take input;
+            # clickable already implies present and visible, so one wait covers it
             try:
-                # Wait for the element to be present
-                self.wait.until(EC.presence_of_element_located((By.ID, "edit-zipcode")))
-                logging.info("Zipcode input element is present in the DOM")
-                
-                # Wait for the element to be visible
-                self.wait.until(EC.visibility_of_element_located((By.ID, "edit-zipcode")))
-                logging.info("Zipcode input element is visible")
-                
-                # Wait for the element to be interactable
-                self.wait.until(EC.element_to_be_clickable((By.ID, "edit-zipcode")))
-                logging.info("Zipcode input element is clickable")
-                
-                # Get the element
-                zipcode_input = self.driver.find_element(By.ID, "edit-zipcode")
-                logging.info("Found zipcode input with ID 'edit-zipcode'")
-            except (TimeoutException, NoSuchElementException) as e:
-                logging.warning(f"Could not find zipcode input by ID: {e}")
-                try:
-                    # Try by XPath using the exact structure provided
-                    self.wait.until(EC.presence_of_element_located((
-                        By.XPATH, "//div[@id='edit-zipcode-wrapper']/input[@id='edit-zipcode' and @name='zipcode']"
-                    )))
-                    zipcode_input = self.driver.find_element(
-                        By.XPATH, "//div[@id='edit-zipcode-wrapper']/input[@id='edit-zipcode' and @name='zipcode']"
-                    )
-                    logging.info("Found zipcode input by XPath with specific structure")
-                except (TimeoutException, NoSuchElementException) as e:
-                    logging.warning(f"Could not find zipcode input by XPath: {e}")
-                    # Try by name as a fallback
-                    try:
-                        self.wait.until(EC.presence_of_element_located((By.NAME, "zipcode")))
-                        zipcode_input = self.driver.find_element(By.NAME, "zipcode")
-                        logging.info("Found zipcode input by name 'zipcode'")
-                    except (TimeoutException, NoSuchElementException) as e:
-                        logging.error(f"Could not find zipcode input field: {e}")
-                        self.save_screenshot(f"zipcode_not_found_{zipcode}")
-                        self.save_page_source(f"zipcode_not_found_{zipcode}")
-                        return False
-            
-            # Try to scroll the element into view
-            self.driver.execute_script("arguments[0].scrollIntoView(true);", zipcode_input)
-            time.sleep(1)  # Give time for scrolling
-            
-            # Try to focus the element
-            self.driver.execute_script("arguments[0].focus();", zipcode_input)
-            time.sleep(1)  # Give time for focus
-            
-            # Clear the field using JavaScript
-            self.driver.execute_script("arguments[0].value = '';", zipcode_input)
+                zipcode_input = self.wait.until(EC.element_to_be_clickable(LOC_ZIPCODE_INPUT))
+                logger.info("Found zipcode input field")
+            except TimeoutException as e:
+                logger.error(f"Could not find zipcode input field: {e}")
+                self.save_screenshot(f"zipcode_not_found_{zipcode}")
+                self.save_page_source(f"zipcode_not_found_{zipcode}")
+                return False
             
-            # Enter the zipcode using JavaScript
-            self.driver.execute_script(f"arguments[0].value = '{zipcode}';", zipcode_input)
-            logging.info(f"Entered zipcode {zipcode} using JavaScript")
+            # Scroll to, focus, clear and fill the field in one call
+            self.driver.execute_script(FILL_INPUT_JS, zipcode_input, zipcode)
+            logger.info(f"Entered zipcode {zipcode} using JavaScript")
             
             # Save screenshot after entering zipcode
-            self.save_screenshot(f"zipcode_entered_{zipcode}")
+            if self.debug:
+                self.save_screenshot(f"zipcode_entered_{zipcode}")
             
-            # Find and click the submit button
+            # Find the submit button: by ID, else in the zipcode's form, else anywhere on the page
             try:
-                # Look for the submit button by ID
-                submit_button = self.driver.find_element(By.ID, "edit-submit-residential-rate-search2")
-                logging.info("Found submit button by ID")
-            except NoSuchElementException:
-                try:
-                    # Try to find a button within the same form
-                    form = zipcode_input.find_element(By.XPATH, "./ancestor::form")
-                    submit_button = form.find_element(By.XPATH, ".//input[@type='submit'] | .//button[@type='submit']")
-                    logging.info("Found submit button within the same form")
-                except NoSuchElementException:
-                    try:
-                        # Try to find any submit button on the page
-                        submit_button = self.driver.find_element(By.XPATH, "//input[@type='submit'] | //button[@type='submit']")
-                        logging.info("Found submit button on the page")
-                    except NoSuchElementException:
-                        logging.error("Could not find submit button")
-                        self.save_screenshot(f"submit_button_not_found_{zipcode}")
-                        self.save_page_source(f"submit_button_not_found_{zipcode}")
-                        return False
-            
-            # Try to scroll the submit button into view
-            self.driver.execute_script("arguments[0].scrollIntoView(true);", submit_button)
-            time.sleep(1)  # Give time for scrolling
+                _, submit_button = self._find_first(SUBMIT_LOCATORS, self.fast_wait, clickable=True)
+                logger.info("Found submit button")
+            except TimeoutException:
+                logger.error("Could not find submit button")
+                self.save_screenshot(f"submit_button_not_found_{zipcode}")
+                self.save_page_source(f"submit_button_not_found_{zipcode}")
+                return False
             
-            # Click the submit button using JavaScript
+            # Scroll the submit button into view and click it using JavaScript
             try:
-                self.driver.execute_script("arguments[0].click();", submit_button)
-                logging.info("Clicked submit button using JavaScript")
+                self.driver.execute_script(SCROLL_AND_CLICK_JS, submit_button)
+                logger.info("Clicked submit button using JavaScript")
             except Exception as e:
-                logging.error(f"Failed to click submit button with JavaScript: {e}")
+                logger.error(f"Failed to click submit button with JavaScript: {e}")
                 return False
             
-            # Wait for the results page to load
+            # Let the shop page go first, so nothing still on it passes for the results (a
+            # submit that refreshes the form in place keeps the button; the waits below still apply)
+            try:
+                self.fast_wait.until(EC.staleness_of(submit_button))
+            except TimeoutException:
+                logger.info("Submit button still on the page, waiting for the results in place")
+            
+            # Wait for the results page to load: the export button, or failing that the filter
+            # options (only as a last resort, since the shop page has radios and checkboxes too)
             try:
-                # Wait for the export button to appear or any indication of results
-                self.wait.until(EC.presence_of_element_located((
-                    By.XPATH, "//button[contains(text(), 'Export') or contains(@class, 'export')]"
-                )))
-                logging.info("Results page loaded successfully (found export button)")
+                locator, _ = self._find_first(RESULTS_PAGE_LOCATORS, self.nav_wait)
+                logger.info(f"Results page loaded successfully (found {locator[1]})")
             except TimeoutException:
                 try:
-                    # Try looking for filter options which would indicate results page
-                    self.wait.until(EC.presence_of_element_located((
-                        By.XPATH, "//input[@type='radio' or @type='checkbox']"
-                    )))
-                    logging.info("Results page loaded successfully (found filter options)")
+                    self.fast_wait.until(EC.presence_of_element_located(LOC_FILTER_INPUTS))
+                    logger.info("Results page loaded successfully (found filter options)")
                 except TimeoutException:
-                    logging.error("Timeout waiting for results page to load")
+                    logger.error("Timeout waiting for results page to load")
                     self.save_screenshot(f"results_page_timeout_{zipcode}")
                     self.save_page_source(f"results_page_timeout_{zipcode}")
                     return False
             
             # Save screenshot of results page
-            self.save_screenshot(f"results_page_{zipcode}")
-            self.save_page_source(f"results_page_{zipcode}")
+            if self.debug:
+                self.save_screenshot(f"results_page_{zipcode}")
+                self.save_page_source(f"results_page_{zipcode}")
             
             return True
         except Exception as e:
-            logging.error(f"Error entering zipcode: {e}")
+            logger.error(f"Error entering zipcode: {e}")
             self.save_screenshot(f"zipcode_error_{zipcode}")
             self.save_page_source(f"zipcode_error_{zipcode}")
             return False
     
     def apply_filters(self):
         """Apply the specified filters to the results page"""
-        logging.info("Applying filters to results page")
+        logger.info("Applying filters to results page")
         
         try:
-            # Wait for filters to be available
-            self.wait.until(EC.presence_of_element_located((By.XPATH, "//input[@type='radio' or @type='checkbox']")))
+            # Wait for filters to be available; the first one also marks the current view,
+            # to tell when the refresh below has replaced it
+            view_marker = self.wait.until(EC.presence_of_element_located(LOC_FILTER_INPUTS))
             
-            # 1. Select Fixed Price checkbox
-            self._select_fixed_price()
+            # Set every filter in one script so the form re-renders once, not after each click
+            report, changed_forms = self.driver.execute_script(LABEL_TEXT_JS + BATCH_FILTER_JS, FILTERS)
             
-            # 2. Select "Any" for Term Length (this might be default)
-            self._select_term_length_any()
-            
-            # 3. Select Terms & Conditions checkboxes
-            self._select_terms_conditions()
+            for name, status, detail in report:
+                if status == 'missing':
+                    logger.warning(f"Could not find filter: {name}")
+                elif status == 'already':
+                    logger.info(f"Filter already selected: {name}")
+                else:
+                    logger.info(f"Selected filter: {name}" + (f" ({detail})" if detail else ""))
             
-            # 4. Select "R - Regular Residential Service"
-            self._select_regular_residential_service()
+            # Wait for results to update. A debounced or auto-submitted form may not have
+            # started its request yet, so first wait (up to the baseline's 5 seconds) for the
+            # throbber to appear or the view to be replaced, then for the throbber to go away
+            if changed_forms:
+                def refresh_started(driver):
+                    return bool(driver.find_elements(*LOC_AJAX_PROGRESS)) or EC.staleness_of(view_marker)(driver)
+                
+                try:
+                    WebDriverWait(self.driver, 5, poll_frequency=0.05).until(refresh_started)
+                except TimeoutException:
+                    logger.warning("No results refresh seen within 5 seconds, continuing")
+                try:
+                    WebDriverWait(self.driver, 10, poll_frequency=0.1).until(
+                        EC.invisibility_of_element_located(LOC_AJAX_PROGRESS)
+                    )
+                except TimeoutException:
+                    logger.warning("Results still refreshing after 10 seconds, continuing")
             
             # Save screenshot after applying filters
-            self.save_screenshot("after_filters_applied")
-            self.save_page_source("after_filters_applied")
-            
-            # Wait for results to update
-            time.sleep(5)
+            if self.debug:
+                self.save_screenshot("after_filters_applied")
+                self.save_page_source("after_filters_applied")
             
             return True
         except Exception as e:
-            logging.error(f"Error applying filters: {e}")
+            logger.error(f"Error applying filters: {e}")
             self.save_screenshot("filter_error")
             self.save_page_source("filter_error")
             return False
     
-    def _select_fixed_price(self):
-        """Select the Fixed Price checkbox"""
-        logging.info("Selecting Fixed Price checkbox")
-        
-        try:
-            # Try different approaches to find the Fixed Price checkbox
-            try:
-                # Try by ID
-                fixed_price_checkbox = self.driver.find_element(By.ID, "edit-field-type-value-fixed")
-                logging.info("Found Fixed Price checkbox by ID")
-            except NoSuchElementException:
-                try:
-                    # Try by label text
-                    fixed_price_checkbox = self.driver.find_element(
-                        By.XPATH, "//label[contains(text(), 'Fixed price')]/preceding-sibling::input[@type='checkbox'] | "
-                                  "//label[contains(text(), 'Fixed price')]/following-sibling::input[@type='checkbox']"
-                    )
-                    logging.info("Found Fixed Price checkbox by label text")
-                except NoSuchElementException:
-                    try:
-                        # Try by looking at all checkboxes
-                        checkboxes = self.driver.find_elements(By.XPATH, "//input[@type='checkbox']")
-                        fixed_price_checkbox = None
-                        
-                        for checkbox in checkboxes:
-                            # Check the label or surrounding text
-                            try:
-                                label = checkbox.find_element(By.XPATH, "./following-sibling::label | ./preceding-sibling::label | ./parent::label")
-                                if "fixed" in label.text.lower() and "price" in label.text.lower():
-                                    fixed_price_checkbox = checkbox
-                                    logging.info(f"Found Fixed Price checkbox by label content: {label.text}")
-                                    break
-                            except NoSuchElementException:
-                                # If no label, check parent elements for text
-                                parent = checkbox.find_element(By.XPATH, "./..")
-                                if "fixed" in parent.text.lower() and "price" in parent.text.lower():
-                                    fixed_price_checkbox = checkbox
-                                    logging.info(f"Found Fixed Price checkbox by parent content: {parent.text}")
-                                    break
-                        
-                        if not fixed_price_checkbox:
-                            logging.warning("Could not find Fixed Price checkbox")
-                            return
-                    except Exception as e:
-                        logging.warning(f"Error finding Fixed Price checkbox: {e}")
-                        return
-            
-            # Check if already selected
-            if not fixed_price_checkbox.is_selected():
-                # Try to click with JavaScript if regular click doesn't work
-                try:
-                    fixed_price_checkbox.click()
-                    logging.info("Selected Fixed Price checkbox with regular click")
-                except Exception as e:
-                    logging.warning(f"Regular click failed: {e}, trying JavaScript click")
-                    self.driver.execute_script("arguments[0].click();", fixed_price_checkbox)
-                    logging.info("Selected Fixed Price checkbox with JavaScript click")
-                
-                time.sleep(1)  # Small delay to let the page update
-            else:
-                logging.info("Fixed Price checkbox already selected")
-        except Exception as e:
-            logging.error(f"Error selecting Fixed Price checkbox: {e}")
-    
-    def _select_term_length_any(self):
-        """Select 'Any' for Term Length"""
-        logging.info("Selecting 'Any' for Term Length")
-        
-        try:
-            # Try to find a dropdown for term length
-            try:
-                # Look for select elements
-                selects = self.driver.find_elements(By.TAG_NAME, "select")
-                term_length_select = None
-                
-                for select in selects:
-                    # Check if this select is for term length
-                    try:
-                        label = select.find_element(By.XPATH, "./preceding-sibling::label | ./following-sibling::label | ./parent::*/preceding-sibling::label")
-                        if "term" in label.text.lower() and "length" in label.text.lower():
-                            term_length_select = select
-                            logging.info(f"Found Term Length select by label: {label.text}")
-                            break
-                    except NoSuchElementException:
-                        # If no label, check the options
-                        options = select.find_elements(By.TAG_NAME, "option")
-                        option_texts = [option.text.lower() for option in options]
-                        if any("month" in text for text in option_texts):
-                            term_length_select = select
-                            logging.info("Found Term Length select by options containing 'month'")
-                            break
-                
-                if term_length_select:
-                    # Create Select object
-                    select_obj = Select(term_length_select)
-                    
-                    # Try to select "Any" option
-                    try:
-                        select_obj.select_by_visible_text("Any")
-                        logging.info("Selected 'Any' for Term Length")
-                    except Exception:
-                        try:
-                            # Try selecting the first option (often "Any" or "All")
-                            select_obj.select_by_index(0)
-                            logging.info(f"Selected first option for Term Length: {select_obj.first_selected_option.text}")
-                        except Exception as e:
-                            logging.warning(f"Could not select option for Term Length: {e}")
-                else:
-                    # If no dropdown found, look for radio buttons for term length
-                    term_length_radios = self.driver.find_elements(
-                        By.XPATH, "//label[contains(text(), 'Any')]/input[@type='radio'] | "
-                                  "//label[contains(text(), 'Any')]/preceding-sibling::input[@type='radio'] | "
-                                  "//label[contains(text(), 'Any')]/following-sibling::input[@type='radio']"
-                    )
-                    
-                    if term_length_radios:
-                        # Click the "Any" radio button
-                        try:
-                            term_length_radios[0].click()
-                            logging.info("Selected 'Any' radio button for Term Length")
-                        except Exception as e:
-                            logging.warning(f"Could not click 'Any' radio button: {e}")
-                            try:
-                                self.driver.execute_script("arguments[0].click();", term_length_radios[0])
-                                logging.info("Selected 'Any' radio button for Term Length with JavaScript")
-                            except Exception as e:
-                                logging.warning(f"JavaScript click failed: {e}")
-                    else:
-                        logging.info("No Term Length selection found, assuming default is 'Any'")
-            except Exception as e:
-                logging.warning(f"Error finding Term Length selection: {e}")
-        except Exception as e:
-            logging.error(f"Error selecting Term Length: {e}")
-    
-    def _select_terms_conditions(self):
-        """Select the Terms & Conditions checkboxes"""
-        logging.info("Selecting Terms & Conditions checkboxes")
-        
-        # List of conditions to select
-        conditions = [
-            "No Cancellation Fee",
-            "No Deposit Required",
-            "No Monthly Fee"
-        ]
-        
-        try:
-            for condition in conditions:
-                try:
-                    # Try to find checkbox by label text
-                    checkbox = self.driver.find_element(
-                        By.XPATH, f"//label[contains(text(), '{condition}')]/input[@type='checkbox'] | "
-                                  f"//label[contains(text(), '{condition}')]/preceding-sibling::input[@type='checkbox'] | "
-                                  f"//label[contains(text(), '{condition}')]/following-sibling::input[@type='checkbox']"
-                    )
-                    
-                    # Check if already selected
-                    if not checkbox.is_selected():
-                        # Try to click with JavaScript if regular click doesn't work
-                        try:
-                            checkbox.click()
-                            logging.info(f"Selected checkbox: {condition}")
-                        except Exception as e:
-                            logging.warning(f"Regular click failed for {condition}: {e}, trying JavaScript click")
-                            self.driver.execute_script("arguments[0].click();", checkbox)
-                            logging.info(f"Selected checkbox: {condition} with JavaScript")
-                        
-                        time.sleep(1)  # Small delay to let the page update
-                    else:
-                        logging.info(f"Checkbox {condition} already selected")
-                except NoSuchElementException:
-                    logging.warning(f"Could not find checkbox for: {condition}")
-                    
-                    # Try a more general approach
-                    try:
-                        # Get all checkboxes
-                        checkboxes = self.driver.find_elements(By.XPATH, "//input[@type='checkbox']")
-                        
-                        for checkbox in checkboxes:
-                            # Check the label or surrounding text
-                            try:
-                                label = checkbox.find_element(By.XPATH, "./following-sibling::label | ./preceding-sibling::label | ./parent::label")
-                                label_text = label.text.lower()
-                                
-                                condition_lower = condition.lower()
-                                if all(word.lower() in label_text for word in condition_lower.split()):
-                                    if not checkbox.is_selected():
-                                        try:
-                                            checkbox.click()
-                                            logging.info(f"Selected checkbox with label: {label.text}")
-                                        except Exception:
-                                            self.driver.execute_script("arguments[0].click();", checkbox)
-                                            logging.info(f"Selected checkbox with label: {label.text} using JavaScript")
-                                        
-                                        time.sleep(1)  # Small delay to let the page update
-                                    else:
-                                        logging.info(f"Checkbox with label: {label.text} already selected")
-                                    break
-                            except NoSuchElementException:
-                                continue
-                    except Exception as e:
-                        logging.warning(f"Error in general checkbox search for {condition}: {e}")
-        except Exception as e:
-            logging.error(f"Error selecting Terms & Conditions checkboxes: {e}")
-    
-    def _select_regular_residential_service(self):
-        """Select 'R - Regular Residential Service'"""
-        logging.info("Selecting 'R - Regular Residential Service'")
-        
-        try:
-            # Try to find a dropdown or radio buttons for rate schedule
-            try:
-                # Look for a select element for rate schedule
-                rate_schedule_select = None
-                
-                # Try to find by label text
-                selects = self.driver.find_elements(
-                    By.XPATH, "//label[contains(text(), 'Rate Schedule') or contains(text(), 'Service Type')]/following-sibling::select | "
-                              "//label[contains(text(), 'Rate Schedule') or contains(text(), 'Service Type')]/preceding-sibling::select"
-                )
-                
-                if selects:
-                    rate_schedule_select = selects[0]
-                    logging.info("Found Rate Schedule select by label")
-                else:
-                    # Try to find any select with options containing "Residential Service"
-                    selects = self.driver.find_elements(By.TAG_NAME, "select")
-                    for select in selects:
-                        options = select.find_elements(By.TAG_NAME, "option")
-                        for option in options:
-                            if "Regular Residential Service" in option.text:
-                                rate_schedule_select = select
-                                logging.info("Found Rate Schedule select by option text")
-                                break
-                        if rate_schedule_select:
-                            break
-                
-                if rate_schedule_select:
-                    # Create Select object
-                    select_obj = Select(rate_schedule_select)
-                    
-                    # Try to select "R - Regular Residential Service"
-                    try:
-                        select_obj.select_by_visible_text("R - Regular Residential Service")
-                        logging.info("Selected 'R - Regular Residential Service' by visible text")
-                    except Exception:
-                        try:
-                            # Try selecting by partial text
-                            options = select_obj.options
-                            for i, option in enumerate(options):
-                                if "Regular Residential Service" in option.text:
-                                    select_obj.select_by_index(i)
-                                    logging.info(f"Selected option: {option.text}")
-                                    break
-                        except Exception as e:
-                            logging.warning(f"Could not select 'R - Regular Residential Service': {e}")
-                else:
-                    # Try to find radio buttons or checkboxes for rate schedule
-                    rate_schedule_inputs = self.driver.find_elements(
-                        By.XPATH, "//label[contains(text(), 'Regular Residential Service')]/preceding-sibling::input | "
-                                  "//label[contains(text(), 'Regular Residential Service')]/following-sibling::input"
-                    )
-                    
-                    if rate_schedule_inputs:
-                        # Click the "R - Regular Residential Service" input
-                        try:
-                            rate_schedule_inputs[0].click()
-                            logging.info("Selected 'R - Regular Residential Service' input")
-                        except Exception as e:
-                            logging.warning(f"Could not click 'R - Regular Residential Service' input: {e}")
-                            try:
-                                self.driver.execute_script("arguments[0].click();", rate_schedule_inputs[0])
-                                logging.info("Selected 'R - Regular Residential Service' input with JavaScript")
-                            except Exception as e:
-                                logging.warning(f"JavaScript click failed: {e}")
-                    else:
-                        logging.warning("Could not find 'R - Regular Residential Service' selection")
-            except Exception as e:
-                logging.warning(f"Error finding Rate Schedule selection: {e}")
-        except Exception as e:
-            logging.error(f"Error selecting 'R - Regular Residential Service': {e}")
-    
     def click_export_button(self):
         """Click the Export Offer to CSV button and wait for the download"""
-        logging.info("Clicking Export Offer to CSV button")
+        logger.info("Clicking Export Offer to CSV button")
         
         try:
-            # Find the Export button
-            try:
-                # Try to find by text content
-                export_button = self.driver.find_element(
-                    By.XPATH, "//a[contains(text(), 'Export') and contains(text(), 'CSV')] | "
-                              "//button[contains(text(), 'Export') and contains(text(), 'CSV')]"
-                )
-                logging.info("Found Export button by text")
-            except NoSuchElementException:
-                try:
-                    # Try to find by class or ID
-                    export_button = self.driver.find_element(
-                        By.XPATH, "//a[contains(@class, 'export') or contains(@id, 'export')] | "
-                                  "//button[contains(@class, 'export') or contains(@id, 'export')]"
-                    )
-                    logging.info("Found Export button by class/ID")
-                except NoSuchElementException:
-                    # Try to find any link with "csv" in the URL
-                    export_button = self.driver.find_element(
-                        By.XPATH, "//a[contains(@href, 'csv') or contains(@href, 'CSV')]"
-                    )
-                    logging.info("Found Export button by href")
+            # Find the Export button by text, else by class/ID, else any link with "csv"
+            # in the URL, trying all three in the page in a single call
+            match = self.driver.execute_script(FIRST_MATCH_JS, EXPORT_LOCATORS)
+            if not match:
+                raise NoSuchElementException("No Export button found by text, class/ID or href")
+            export_button, matched = match
+            logger.info(f"Found Export button by {EXPORT_MATCH_NAMES[matched]}")
+            
+            # Remember a plain export link so later zipcodes can skip the browser
+            self._remember_export_link(export_button.get_attribute('href'))
             
-            # Try to scroll the button into view
+            # Try to scroll the button into view (an instant scroll, so nothing to wait for)
             self.driver.execute_script("arguments[0].scrollIntoView(true);", export_button)
-            time.sleep(1)  # Give time for scrolling
+            
+            # Drop earlier events so the download wait below only sees this export, and note
+            # the files already there in case the wait has to watch the directory instead
+            has_download_events = self._clear_download_events()
+            files_before = set(os.listdir(self.download_dir))
             
             # Click the button
             try:
                 export_button.click()
-                logging.info("Clicked Export button")
+                logger.info("Clicked Export button")
             except Exception as e:
-                logging.warning(f"Regular click failed: {e}, trying JavaScript click")
+                logger.warning(f"Regular click failed: {e}, trying JavaScript click")
                 self.driver.execute_script("arguments[0].click();", export_button)
-                logging.info("Clicked Export button with JavaScript")
+                logger.info("Clicked Export button with JavaScript")
             
-            # Wait for the download to complete
-            time.sleep(5)  # Give time for the download to start and complete
-            
-            # Check if a CSV file was downloaded
-            csv_files = [f for f in os.listdir(self.download_dir) if f.endswith('.csv')]
+            # Wait for the download to complete and take the file this click added
+            # (_wait_for_download raises if it is canceled); process_csv_file picks up the
+            # path found here
+            if has_download_events:
+                csv_path = self._wait_for_download(files_before)
+            else:
+                csv_path = self._wait_for_new_csv(files_before)
+            self._latest_csv_path = csv_path
             
-            if not csv_files:
-                logging.error("No CSV files found after clicking Export button")
+            if csv_path is None:
+                logger.error("No new CSV file downloaded after clicking Export button")
                 self.save_screenshot("export_error_no_csv")
                 self.save_page_source("export_error_no_csv")
                 return False
             
-            # Sort by modification time (newest first)
-            csv_files.sort(key=lambda x: os.path.getmtime(os.path.join(self.download_dir, x)), reverse=True)
-            
-            # Get the most recent CSV file
-            latest_csv = csv_files[0]
-            csv_path = os.path.join(self.download_dir, latest_csv)
-            
-            logging.info(f"CSV file downloaded: {csv_path}")
+            logger.info(f"CSV file downloaded: {csv_path}")
             
             return True
         except Exception as e:
-            logging.error(f"Error clicking Export button: {e}")
+            logger.error(f"Error clicking Export button: {e}")
             self.save_screenshot("export_error")
             self.save_page_source("export_error")
             return False
     
+    def _wait_for_new_csv(self, files_before):
+        """
+        Poll the download directory until a CSV that wasn't in files_before appears and
+        Chrome has no download in progress, backing off from 50ms to 500ms between checks.
+        Used when download events aren't available. Returns the CSV's path, or None if
+        none appeared within download_timeout.
+        """
+        deadline = time.monotonic() + self.download_timeout
+        delay = 0.05
+        while time.monotonic() < deadline:
+            csv_path = self._new_csv(files_before)
+            if csv_path:
+                logger.info("Download finished")
+                return csv_path
+            time.sleep(delay)
+            delay = min(delay * 2, 0.5)
+        
+        logger.warning(f"No new CSV appeared within {self.download_timeout} seconds")
+        return None
+    
+    def _new_csv(self, files_before):
+        """
+        Return the path of a CSV in the download directory that wasn't in files_before,
+        or None while there is none or Chrome still has a download in progress.
+        """
+        new_files = set(os.listdir(self.download_dir)) - files_before
+        if any(name.endswith(('.crdownload', '.part')) for name in new_files):
+            return None
+        # .tmp_ files are other writers' atomic writes still in progress
+        new_csvs = sorted(name for name in new_files if name.endswith('.csv') and not name.startswith('.tmp_'))
+        return os.path.join(self.download_dir, new_csvs[0]) if new_csvs else None
+    
+    def _remember_export_link(self, href):
+        """Keep the export link as a template if the current zipcode is in its query string"""
+        self._export_template = None
+        if not href or not getattr(self, 'zipcode', None):
+            return
+        
+        parts = urlsplit(href)
+        query = parse_qsl(parts.query, keep_blank_values=True)
+        zip_index = next((i for i, (_, value) in enumerate(query) if value == self.zipcode), None)
+        if zip_index is None:
+            return
+        
+        self._export_template = (parts, query, zip_index)
+        
+        # Reuse the browser's session (cookies and user agent) for direct requests
+        self._http = requests.Session()
+        self._http.headers['User-Agent'] = self.driver.execute_script("return navigator.userAgent;")
+        for cookie in self.driver.get_cookies():
+            self._http.cookies.set(cookie['name'], cookie['value'], domain=cookie.get('domain'), path=cookie.get('path', '/'))
+        logger.info("Export link takes the zipcode as a parameter; later zipcodes will try a direct download")
+    
+    def _fast_fetch(self, zipcode):
+        """
+        Download the export for a zipcode over plain HTTP instead of driving the browser.
+        
+        Only possible after a browser run found an export link with the zipcode in its
+        query string. Returns False whenever that isn't the case or the response doesn't
+        look like the export, so the caller can fall back to the browser.
+        """
+        if self._export_template is None:
+            return False
+        
+        parts, query, zip_index = self._export_template
+        query = list(query)
+        query[zip_index] = (query[zip_index][0], zipcode)
+        url = urlunsplit(parts._replace(query=urlencode(query)))
+        
+        try:
+            response = self._http.get(url, timeout=30)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            logger.warning(f"Direct download failed for zipcode {zipcode}, using the browser: {e}")
+            return False
+        
+        # The export's header row names the supplier column; anything else is an error or login page
+        header = response.content.split(b'\n', 1)[0]
+        if b'Supplier' not in header:
+            logger.warning(f"Direct download for zipcode {zipcode} did not return the export, using the browser")
+            return False
+        
+        # Written under a temporary name so process_csv_file never sees a partial file
+        csv_path = os.path.join(self.download_dir, f"pagasswitch_direct_{zipcode}_{self.timestamp}.csv")
+        tmp_path = os.path.join(self.download_dir, f".tmp_{os.getpid()}_{os.path.basename(csv_path)}")
+        with open(tmp_path, 'wb') as f:
+            f.write(response.content)
+        os.replace(tmp_path, csv_path)
+        self._latest_csv_path = csv_path
+        
+        logger.info(f"Downloaded export for zipcode {zipcode} directly: {csv_path}")
+        return True
+    
+    def _clear_download_events(self):
+        """
+        Discard the buffered performance log, returning whether the driver has one.
+        
+        A driver created without performance logging can't report downloads.
+        """
+        try:
+            self.driver.get_log('performance')
+            return True
+        except WebDriverException:
+            return False
+    
+    def _wait_for_download(self, files_before):
+        """
+        Wait until Chrome reports the export download completed, up to download_timeout,
+        and return the new CSV's path, or None if none arrived.
+        
+        The events can fail to show up (the download attributed to another target, say),
+        so until one does the directory is checked as well, and a timeout falls back to it.
+        """
+        started = set()
+        
+        def download_finished(driver):
+            for entry in driver.get_log('performance'):
+                message = json.loads(entry['message'])['message']
+                method, params = message.get('method'), message.get('params', {})
+                
+                if method == 'Page.downloadWillBegin':
+                    started.add(params['guid'])
+                    logger.info(f"Download started: {params.get('suggestedFilename')}")
+                elif method == 'Page.downloadProgress' and params.get('guid') in started:
+                    if params.get('state') == 'completed':
+                        return True
+                    if params.get('state') == 'canceled':
+                        raise RuntimeError("Export download was canceled")
+            return not started and self._new_csv(files_before) is not None
+        
+        try:
+            WebDriverWait(self.driver, self.download_timeout, poll_frequency=0.1).until(download_finished)
+            logger.info("Download completed")
+        except TimeoutException:
+            logger.warning(f"No download completed event within {self.download_timeout} seconds, checking the download directory")
+        return self._new_csv(files_before)
+    
     def process_csv_file(self, zipcode):
         """Process the downloaded CSV file"""
-        logging.info(f"Processing CSV file for zipcode: {zipcode}")
+        logger.info(f"Processing CSV file for zipcode: {zipcode}")
         
         try:
-            # Look for the downloaded CSV file
-            csv_files = [f for f in os.listdir(self.download_dir) if f.endswith('.csv')]
+            # Use the file the download step found; never guess from the directory, which
+            # may hold earlier runs' exports
+            csv_path = self._latest_csv_path
+            self._latest_csv_path = None
             
-            if not csv_files:
-                logging.error("No CSV files found in download directory")
+            if csv_path is None:
+                logger.error("No downloaded CSV file to process")
                 return False
             
-            # Sort by modification time (newest first)
-            csv_files.sort(key=lambda x: os.path.getmtime(os.path.join(self.download_dir, x)), reverse=True)
+            logger.info(f"Found CSV file: {csv_path}")
             
-            # Get the most recent CSV file
-            latest_csv = csv_files[0]
-            csv_path = os.path.join(self.download_dir, latest_csv)
-            
-            logging.info(f"Found CSV file: {csv_path}")
-            
-            # Copy the file with a timestamp
-            output_filename = f"pagasswitch_export_{self.timestamp}.csv"
+            # Keep the raw export under a name with a timestamp. A hard link costs no copying
+            # when the download and output directories share a filesystem; copy otherwise
+            output_filename = f"pagasswitch_export_{zipcode}_{self.timestamp}.csv"
             output_path = os.path.join(self.output_dir, output_filename)
             
-            import shutil
-            shutil.copy2(csv_path, output_path)
-            logging.info(f"CSV file copied to: {output_path}")
+            try:
+                # A retry within the same run replaces the earlier attempt's file
+                if os.path.lexists(output_path):
+                    os.remove(output_path)
+                os.link(csv_path, output_path)
+                logger.info(f"CSV file linked to: {output_path}")
+            except OSError:
+                shutil.copy2(csv_path, output_path)
+                logger.info(f"CSV file copied to: {output_path}")
             
             # Read the CSV file
             try:
-                df = pd.read_csv(csv_path)
-                logging.info(f"CSV file read successfully with {len(df)} rows")
+                df = read_export_csv(csv_path)
+                logger.info(f"CSV file read successfully with {len(df)} rows")
                 
                 # Store the original row count
                 original_count = len(df)
                 
-                # Apply filters based on specified criteria
-                filtered_df = df.copy()
-                
-                # Filter 1: Service Type = 'Residential'
-                if 'Service Type' in filtered_df.columns:
-                    filtered_df = filtered_df[filtered_df['Service Type'] == 'Residential']
-                    logging.info(f"Filtered to {len(filtered_df)} rows with Service Type = 'Residential'")
-                else:
-                    logging.warning("No 'Service Type' column found, skipping this filter")
-                
-                # Filter 2: Type = 'Fixed'
-                if 'Type' in filtered_df.columns:
-                    filtered_df = filtered_df[filtered_df['Type'] == 'Fixed']
-                    logging.info(f"Filtered to {len(filtered_df)} rows with Type = 'Fixed'")
-                else:
-                    logging.warning("No 'Type' column found, skipping this filter")
-                
-                # Filter 3: Monthly Fee = 'No'
-                if 'Monthly Fee' in filtered_df.columns:
-                    filtered_df = filtered_df[filtered_df['Monthly Fee'] == 'No']
-                    logging.info(f"Filtered to {len(filtered_df)} rows with Monthly Fee = 'No'")
-                else:
-                    logging.warning("No 'Monthly Fee' column found, skipping this filter")
-                
-                # Filter 4: Cancellation Fee is blank or NaN
-                if 'Cancellation Fee' in filtered_df.columns:
-                    filtered_df = filtered_df[filtered_df['Cancellation Fee'].isna() | 
-                                             (filtered_df['Cancellation Fee'] == '') | 
-                                             (filtered_df['Cancellation Fee'].astype(str) == 'nan')]
-                    logging.info(f"Filtered to {len(filtered_df)} rows with blank Cancellation Fee")
-                else:
-                    logging.warning("No 'Cancellation Fee' column found, skipping this filter")
-                
-                # Filter 5: Discounts/Incentives Available = 'No'
-                if 'Discounts/Incentives Available' in filtered_df.columns:
-                    filtered_df = filtered_df[filtered_df['Discounts/Incentives Available'] == 'No']
-                    logging.info(f"Filtered to {len(filtered_df)} rows with Discounts/Incentives Available = 'No'")
-                else:
-                    logging.warning("No 'Discounts/Incentives Available' column found, skipping this filter")
+                # Apply filters based on specified criteria, combined into one row mask so the
+                # frame is only sliced once; the log still shows the running count per filter
+                row_filters = [
+                    ('Service Type', "Service Type = 'Residential'", lambda col: col == 'Residential'),
+                    ('Type', "Type = 'Fixed'", lambda col: col == 'Fixed'),
+                    ('Monthly Fee', "Monthly Fee = 'No'", lambda col: col == 'No'),
+                    # One string conversion covers both the empty and the literal 'nan' case
+                    ('Cancellation Fee', "blank Cancellation Fee", lambda col: col.isna() | col.astype(str).isin(['', 'nan'])),
+                    ('Discounts/Incentives Available', "Discounts/Incentives Available = 'No'", lambda col: col == 'No'),
+                ]
+                # The mask is a plain NumPy array: no index alignment on each &=, and a missing
+                # value in an Arrow-backed column counts as not matching rather than as NA
+                mask = np.ones(len(df), dtype=bool)
+                for column, description, condition in row_filters:
+                    if column in df.columns:
+                        mask &= condition(df[column]).to_numpy(dtype=bool, na_value=False)
+                        remaining = mask.sum()
+                        logger.info("Filtered to %d rows with %s", remaining, description)
+                        if not remaining:
+                            logger.info("No rows left, skipping the remaining filters")
+                            break
+                    else:
+                        logger.warning("No '%s' column found, skipping this filter", column)
+                filtered_df = df.loc[mask].copy()
                 
                 # Sort by Price (ascending)
                 if 'Price' in filtered_df.columns:
-                    # Convert Price to numeric, coercing errors to NaN
-                    filtered_df['Price'] = pd.to_numeric(filtered_df['Price'], errors='coerce')
+                    # Convert Price to numeric, coercing errors to NaN (the parser often has already)
+                    if not pd.api.types.is_numeric_dtype(filtered_df['Price']):
+                        filtered_df['Price'] = pd.to_numeric(filtered_df['Price'], errors='coerce')
                     # Sort by Price
                     filtered_df = filtered_df.sort_values(by='Price')
-                    logging.info("Sorted results by Price (ascending)")
+                    logger.info("Sorted results by Price (ascending)")
                 else:
-                    logging.warning("No 'Price' column found, skipping sorting")
+                    logger.warning("No 'Price' column found, skipping sorting")
                 
                 # Remove unwanted columns
                 columns_to_remove = []
@@ -796,111 +970,132 @@ class PAGasSwitchExportScraper:
                 # Store 'More info' column if it exists (instead of removing it)
                 more_info_col = None
                 if 'More info' in filtered_df.columns:
-                    more_info_col = filtered_df['More info'].copy()
+                    more_info_col = filtered_df['More info']
                     columns_to_remove.append('More info')
-                    logging.info("Temporarily storing 'More info' column to move it to the end")
+                    logger.info("Temporarily storing 'More info' column to move it to the end")
                 
                 # Remove 'Cancellation Fee' column
                 if 'Cancellation Fee' in filtered_df.columns:
                     columns_to_remove.append('Cancellation Fee')
-                    logging.info("Removing 'Cancellation Fee' column")
+                    logger.info("Removing 'Cancellation Fee' column")
                 
                 # Remove any 'Unnamed' columns
-                unnamed_columns = [col for col in filtered_df.columns if 'Unnamed' in col]
+                unnamed_columns = [col for col in filtered_df.columns if col.startswith('Unnamed')]
                 if unnamed_columns:
                     columns_to_remove.extend(unnamed_columns)
-                    logging.info(f"Removing {len(unnamed_columns)} 'Unnamed' columns")
+                    logger.info(f"Removing {len(unnamed_columns)} 'Unnamed' columns")
                 
-                # Drop the unwanted columns
+                # Work out the columns to keep, then drop and reorder them in one selection
+                # rather than copying the frame once for each (sets keep the membership tests cheap)
+                removed_columns = set(columns_to_remove)
+                kept_columns = [col for col in filtered_df.columns if col not in removed_columns]
                 if columns_to_remove:
-                    filtered_df = filtered_df.drop(columns=columns_to_remove)
-                    logging.info(f"Removed {len(columns_to_remove)} columns")
+                    logger.info(f"Removed {len(columns_to_remove)} columns")
                 
                 # Reorder columns: Supplier, Price, Term Length, then the rest
-                if all(col in filtered_df.columns for col in ['Supplier', 'Price', 'Term Length']):
+                leading_columns = ['Supplier', 'Price', 'Term Length']
+                leading_set = set(leading_columns)
+                if leading_set.issubset(kept_columns):
                     # Get all columns except the ones we want to reorder
-                    other_columns = [col for col in filtered_df.columns if col not in ['Supplier', 'Price', 'Term Length']]
+                    other_columns = [col for col in kept_columns if col not in leading_set]
                     # Create the new column order
-                    new_column_order = ['Supplier', 'Price', 'Term Length'] + other_columns
-                    # Reorder the columns
-                    filtered_df = filtered_df[new_column_order]
-                    logging.info("Reordered columns: Supplier, Price, Term Length, then others")
+                    kept_columns = leading_columns + other_columns
+                    logger.info("Reordered columns: Supplier, Price, Term Length, then others")
                 else:
-                    logging.warning("Could not reorder columns as requested - one or more columns not found")
+                    logger.warning("Could not reorder columns as requested - one or more columns not found")
+                
+                # Only select when something actually moved or went away
+                if kept_columns != list(filtered_df.columns):
+                    filtered_df = filtered_df[kept_columns]
                 
                 # Add "New Customers only" column and add back "More info" column at the end
                 if more_info_col is not None:
                     # Create "New Customers only" column
                     filtered_df['New Customers only'] = 'No'
                     
-                    # Fill the column with 'Yes' if "More info" contains "for new customers"
-                    more_info_col = more_info_col.fillna('')
-                    mask = more_info_col.str.lower().str.contains('for new customers', na=False)
+                    # Fill the column with 'Yes' if "More info" contains "for new customers";
+                    # a case-insensitive plain substring match, without lowercasing a copy first
+                    mask = more_info_col.str.contains('for new customers', case=False, regex=False, na=False)
                     filtered_df.loc[mask, 'New Customers only'] = 'Yes'
                     
                     # Count how many rows were marked as 'Yes'
                     yes_count = mask.sum()
-                    logging.info(f"Added 'New Customers only' column: {yes_count} offers marked as for new customers only")
+                    logger.info(f"Added 'New Customers only' column: {yes_count} offers marked as for new customers only")
                     
-                    # Add "More info" column back at the end
-                    filtered_df['More info'] = more_info_col
-                    logging.info("Added 'More info' column as the last column")
+                    # Add "More info" column back at the end, blank where there is none
+                    filtered_df['More info'] = more_info_col.fillna('')
+                    logger.info("Added 'More info' column as the last column")
                 
                 # Save the filtered data
-                filtered_output = f"pagasswitch_filtered_{zipcode}_{self.timestamp}.csv"
+                filtered_output = f"pagasswitch_filtered_{zipcode}_{self.timestamp}.{self.output_format}"
                 filtered_path = os.path.join(self.output_dir, filtered_output)
-                filtered_df.to_csv(filtered_path, index=False)
-                logging.info(f"Filtered data saved to: {filtered_path}")
+                write_output_atomically(filtered_df, filtered_path, self.output_format)
+                self.filtered_path = filtered_path
+                logger.info(f"Filtered data saved to: {filtered_path}")
                 
-                # Print a summary
-                print("\nNatural Gas Rate Data Summary:")
-                print("==============================")
-                print(f"Zipcode: {zipcode}")
-                print(f"Total records: {original_count}")
-                print(f"Filtered records: {len(filtered_df)}")
-                print("\nFilters applied:")
-                print("- Service Type = 'Residential'")
-                print("- Type = 'Fixed'")
-                print("- Monthly Fee = 'No'")
-                print("- Cancellation Fee is blank")
-                print("- Discounts/Incentives Available = 'No'")
-                print("\nSorted by:")
-                print("- Price (ascending)")
-                print("\nColumns removed:")
-                for col in columns_to_remove:
-                    if col != 'More info':  # Don't list More info as removed since we added it back
-                        print(f"- {col}")
-                print("\nColumns added/modified:")
-                print("- Added 'New Customers only' column (Yes/No based on 'for new customers' text in More info)")
-                print("- Moved 'More info' column to the end")
-                print("\nColumns reordered:")
-                print("- Supplier (first)")
-                print("- Price (second)")
-                print("- Term Length (third)")
-                print(f"\nOriginal CSV: {output_path}")
-                print(f"Filtered CSV: {filtered_path}")
-                
-                # Print the first few rows of the filtered data
-                if not filtered_df.empty:
-                    print("\nFirst few rows of filtered data:")
-                    print(filtered_df.head().to_string())
+                # Print a summary for someone watching the terminal, collected first so it goes
+                # out in a single write; redirected output gets one log line instead, since the
+                # log already has the details
+                if sys.stdout.isatty():
+                    summary = [
+                        "\nNatural Gas Rate Data Summary:",
+                        "==============================",
+                        f"Zipcode: {zipcode}",
+                        f"Total records: {original_count}",
+                        f"Filtered records: {len(filtered_df)}",
+                        "\nFilters applied:",
+                        "- Service Type = 'Residential'",
+                        "- Type = 'Fixed'",
+                        "- Monthly Fee = 'No'",
+                        "- Cancellation Fee is blank",
+                        "- Discounts/Incentives Available = 'No'",
+                        "\nSorted by:",
+                        "- Price (ascending)",
+                        "\nColumns removed:",
+                    ]
+                    # Don't list More info as removed since we added it back
+                    summary += [f"- {col}" for col in columns_to_remove if col != 'More info']
+                    summary += [
+                        "\nColumns added/modified:",
+                        "- Added 'New Customers only' column (Yes/No based on 'for new customers' text in More info)",
+                        "- Moved 'More info' column to the end",
+                        "\nColumns reordered:",
+                        "- Supplier (first)",
+                        "- Price (second)",
+                        "- Term Length (third)",
+                        f"\nOriginal CSV: {output_path}",
+                        f"Filtered {self.output_format.upper()}: {filtered_path}",
+                    ]
+                    
+                    # Add the first few rows of the filtered data
+                    if not filtered_df.empty:
+                        summary += ["\nFirst few rows of filtered data:", filtered_df.head().to_string()]
+                    else:
+                        summary.append("\nNo records match the filter criteria.")
+                    
+                    sys.stdout.write("\n".join(summary) + "\n")
                 else:
-                    print("\nNo records match the filter criteria.")
+                    logger.info("Summary for zipcode %s: kept %d of %d records", zipcode, len(filtered_df), original_count)
                 
                 return True
             except Exception as e:
-                logging.error(f"Error reading CSV file: {e}")
+                logger.error(f"Error reading CSV file: {e}")
                 return False
         except Exception as e:
-            logging.error(f"Error processing CSV file: {e}")
+            logger.error(f"Error processing CSV file: {e}")
             return False
     
     def save_screenshot(self, name):
         """Save a screenshot for debugging"""
-        filename = f"{name}_{self.timestamp}.png"
+        filename = f"{name}_{self.timestamp}.jpg"
         filepath = os.path.join(self.output_dir, filename)
-        self.driver.save_screenshot(filepath)
-        logging.info(f"Saved screenshot to {filepath}")
+        
+        # A JPEG from DevTools is several times smaller than the PNG save_screenshot writes
+        screenshot = self.driver.execute_cdp_cmd("Page.captureScreenshot", {"format": "jpeg", "quality": 60})
+        with open(filepath, 'wb') as f:
+            f.write(base64.b64decode(screenshot["data"]))
+        
+        logger.info(f"Saved screenshot to {filepath}")
     
     def save_page_source(self, name):
         """Save the page source for debugging"""
@@ -910,131 +1105,260 @@ class PAGasSwitchExportScraper:
         with open(filepath, 'w', encoding='utf-8') as f:
             f.write(self.driver.page_source)
         
-        logging.info(f"Saved page source to {filepath}")
+        logger.info(f"Saved page source to {filepath}")
 
-    def run(self, zipcode):
-        """Run the scraper with the specified zipcode"""
-        success = False
-        retry_count = 0
+    def _run_steps(self, zipcode):
+        """Run one scrape attempt for the zipcode on the current tab"""
+        self._ensure_driver()
+        self.zipcode = zipcode
+        
+        # Step 1: Navigate to the shop page
+        if not self.navigate_to_shop_page():
+            logger.error("Failed to navigate to shop page")
+            return False
+        
+        # Step 2: Enter zipcode and navigate to results page
+        if not self.enter_zipcode(zipcode):
+            logger.error("Failed to enter zipcode and navigate to results page")
+            return False
+        
+        # Step 3: Apply filters
+        if not self.apply_filters():
+            logger.error("Failed to apply filters")
+            return False
+        
+        # Step 4: Click export button and download CSV
+        if not self.click_export_button():
+            logger.error("Failed to click export button and download CSV")
+            return False
+        
+        # Step 5: Process the downloaded CSV file
+        if not self.process_csv_file(zipcode):
+            logger.error("Failed to process CSV file")
+            return False
         
-        while retry_count < self.max_retries and not success:
-            if retry_count > 0:
-                logging.info(f"Retry attempt {retry_count} of {self.max_retries}")
+        return True
+    
+    def _run_with_retries(self, zipcode):
+        """Run scrape attempts for the zipcode until one succeeds or retries run out"""
+        for attempt in range(self.max_retries):
+            if attempt > 0:
+                logger.info(f"Retry attempt {attempt} of {self.max_retries}")
                 time.sleep(self.retry_delay)
             
             try:
-                # Step 1: Navigate to the shop page
-                if not self.navigate_to_shop_page():
-                    logging.error("Failed to navigate to shop page")
-                    retry_count += 1
-                    continue
-                
-                # Step 2: Enter zipcode and navigate to results page
-                if not self.enter_zipcode(zipcode):
-                    logging.error("Failed to enter zipcode and navigate to results page")
-                    retry_count += 1
-                    continue
-                
-                # Step 3: Apply filters
-                if not self.apply_filters():
-                    logging.error("Failed to apply filters")
-                    retry_count += 1
-                    continue
-                
-                # Step 4: Click export button and download CSV
-                if not self.click_export_button():
-                    logging.error("Failed to click export button and download CSV")
-                    retry_count += 1
-                    continue
+                if self._run_steps(zipcode):
+                    logger.info("Successfully exported and processed data")
+                    return True
+            except Exception as e:
+                logger.error(f"Unexpected error: {e}")
+            
+            # The browser is kept across retries; only one that has died is replaced
+            if self.owns_driver and self.driver is not None and not self._browser_alive():
+                logger.warning("Browser stopped responding, starting a new one for the next attempt")
+                self.close()
+        
+        logger.error(f"Failed to export and process data after {self.max_retries} attempts")
+        return False
+    
+    def run(self, zipcode):
+        """Run the scraper with the specified zipcode"""
+        try:
+            return self._run_with_retries(zipcode)
+        finally:
+            # Clean up resources (a caller-supplied browser stays open)
+            self.close()
+    
+    def process_zipcodes(self, zipcodes):
+        """
+        Scrape several zipcodes with this one browser, each in a fresh tab, or with
+        a direct download once the export link turns out to take the zipcode.
+        
+        Returns a dict mapping each zipcode to its filtered output path, or to
+        None where that zipcode failed.
+        """
+        results = {}
+        try:
+            self._ensure_driver()
+            home_tab = self.driver.current_window_handle
+            for zipcode in zipcodes:
+                self.filtered_path = None
                 
-                # Step 5: Process the downloaded CSV file
-                if not self.process_csv_file(zipcode):
-                    logging.error("Failed to process CSV file")
-                    retry_count += 1
+                # Once a browser run has shown how the export is requested, try plain HTTP first
+                if self._fast_fetch(zipcode) and self.process_csv_file(zipcode):
+                    results[zipcode] = self.filtered_path
                     continue
                 
-                # If we got here, all steps were successful
-                success = True
-                logging.info("Successfully exported and processed data")
-            
-            except Exception as e:
-                logging.error(f"Unexpected error: {e}")
-                retry_count += 1
-            
-            finally:
-                # Clean up resources
+                # A new tab starts from clean page state without paying for a new Chrome
+                tab_driver = self.driver
+                tab_driver.switch_to.new_window('tab')
                 try:
-                    self.driver.quit()
-                    logging.info("Browser closed")
-                except Exception as e:
-                    logging.error(f"Error closing browser: {e}")
+                    success = self._run_with_retries(zipcode)
+                    results[zipcode] = self.filtered_path if success else None
+                finally:
+                    if self.driver is tab_driver:
+                        self.driver.close()
+                        self.driver.switch_to.window(home_tab)
+                    else:
+                        # The browser was replaced during the retries; its tab is the new home
+                        self._ensure_driver()
+                        home_tab = self.driver.current_window_handle
+        finally:
+            self.close()
         
-        if not success:
-            logging.error(f"Failed to export and process data after {self.max_retries} attempts")
+        return results
+
+def scrape(zipcode, output_dir='output', headless=True, driver=None, output_format='parquet', download_dir=None):
+    """
+    Run the gas scraper for one zipcode and return the path of the filtered output.
+    
+    This is the in-process entry point used by app.py, so it writes Parquet by
+    default. A driver from create_driver() may be passed in and is left open afterwards;
+    it must download into download_dir (the output directory if None).
+    """
+    with PAGasSwitchExportScraper(output_dir=output_dir, headless=headless, download_dir=download_dir, driver=driver, output_format=output_format) as scraper:
+        if not scraper.run(zipcode):
+            raise RuntimeError(f"Failed to scrape natural gas rate data for zipcode {zipcode}")
         
-        return success
+        return scraper.filtered_path
+
+# Per worker process: when this worker last started a zipcode, for spacing out requests
+# to the site, and the directory its downloads go to
+_last_request_time = 0.0
+_worker_download_dir = None
+
+def _process_zipcode(zipcode, output_dir='output', headless=True, max_retries=3, retry_delay=5, request_delay=0.0, output_format='csv', block_assets=False, debug=False, download_timeout=60):
+    """
+    Scrape one zipcode inside a pool worker, with a browser of the worker's own.
+    
+    Each worker process downloads into its own directory so concurrent exports can't be
+    mistaken for one another; the directory is removed when the worker exits. Returns the
+    filtered output path, or None on failure.
+    """
+    global _last_request_time, _worker_download_dir
+    
+    # Keep at least request_delay seconds between this worker's visits to the site
+    remaining = _last_request_time + request_delay - time.monotonic()
+    if remaining > 0:
+        time.sleep(remaining)
+    _last_request_time = time.monotonic()
+    
+    if _worker_download_dir is None:
+        _worker_download_dir = os.path.join(os.path.abspath(output_dir), f"worker_{os.getpid()}")
+        # The raw exports are kept in output_dir, so nothing in here is needed afterwards
+        multiprocessing.util.Finalize(None, shutil.rmtree, args=(_worker_download_dir,), kwargs={'ignore_errors': True}, exitpriority=5)
+    
+    try:
+        with PAGasSwitchExportScraper(output_dir=output_dir, headless=headless, download_dir=_worker_download_dir, max_retries=max_retries, retry_delay=retry_delay, output_format=output_format, block_assets=block_assets, debug=debug, download_timeout=download_timeout) as scraper:
+            if not scraper.run(zipcode):
+                logger.error(f"Failed to scrape zipcode {zipcode}")
+                return None
+            
+            return scraper.filtered_path
+    except Exception as e:
+        logger.error(f"Unexpected error scraping zipcode {zipcode}: {e}")
+        return None
+
+def scrape_many(zipcodes, output_dir='output', headless=True, max_workers=4, request_delay=0.0, max_retries=3, retry_delay=5, output_format='csv', block_assets=False, debug=False, download_timeout=60):
+    """
+    Scrape several zipcodes in parallel, one Chrome instance per worker process.
+    
+    Returns a dict mapping each zipcode to its filtered output path, or to None
+    where that zipcode failed.
+    """
+    worker = partial(
+        _process_zipcode,
+        output_dir=output_dir,
+        headless=headless,
+        max_retries=max_retries,
+        retry_delay=retry_delay,
+        request_delay=request_delay,
+        output_format=output_format,
+        block_assets=block_assets,
+        debug=debug,
+        download_timeout=download_timeout
+    )
+    
+    with ProcessPoolExecutor(max_workers=min(max_workers, len(zipcodes))) as executor:
+        return dict(zip(zipcodes, executor.map(worker, zipcodes)))
 
 def main():
     """Main function to run the scraper"""
     parser = argparse.ArgumentParser(description='Scrape PA Gas Switch website for natural gas offers')
-    parser.add_argument('--zipcode', type=str, required=True, help='Zip code to search for')
+    zipcode_source = parser.add_mutually_exclusive_group(required=True)
+    zipcode_source.add_argument('--zipcode', type=str, nargs='+', help='Zip code(s) to search for, space or comma separated')
+    zipcode_source.add_argument('--zipcodes-file', type=str, help='File listing zip codes, separated by whitespace or commas')
     parser.add_argument('--output-dir', type=str, default='output', help='Directory to save output files')
-    parser.add_argument('--headless', action='store_true', help='Run in headless mode')
+    # A --headless/--no-headless pair rather than BooleanOptionalAction, which needs Python 3.9
+    parser.add_argument('--headless', dest='headless', action='store_true', default=True, help='Run in headless mode (the default)')
+    parser.add_argument('--no-headless', dest='headless', action='store_false', help='Show the browser window while scraping')
     parser.add_argument('--max-retries', type=int, default=3, help='Maximum number of retry attempts')
     parser.add_argument('--retry-delay', type=int, default=5, help='Delay between retry attempts in seconds')
+    parser.add_argument('--workers', type=int, default=4, help='Browser processes to run when scraping several zip codes')
+    parser.add_argument('--request-delay', type=float, default=0.0, help='Minimum seconds between zip codes in each worker')
+    parser.add_argument('--block-assets', action='store_true', help='Skip loading images, fonts, media and trackers (debug screenshots lose them too)')
+    parser.add_argument('--profile-dir', type=str, default=None, help='Chrome profile directory to reuse across runs for a warm HTTP cache (not used by parallel workers)')
+    parser.add_argument('--debug', action='store_true', help='Save a screenshot and the page source after every step')
+    parser.add_argument('--download-timeout', type=int, default=60, help='Seconds to wait for the exported CSV to download')
     args = parser.parse_args()
     
-    logging.info(f"Starting PA Gas Export Scraper for zipcode: {args.zipcode}")
-    logging.info(f"Output directory: {args.output_dir}")
-    logging.info(f"Headless mode: {args.headless}")
-    logging.info(f"Max retries: {args.max_retries}")
-    logging.info(f"Retry delay: {args.retry_delay} seconds")
-    
-    # Create output directory if it doesn't exist
-    os.makedirs(args.output_dir, exist_ok=True)
-    
-    # Initialize retry counter
-    retry_count = 0
-    success = False
+    # Accept "19103,15213" as well as separate arguments, and drop repeats
+    if args.zipcodes_file:
+        with open(args.zipcodes_file) as f:
+            raw_zipcodes = f.read().split()
+    else:
+        raw_zipcodes = args.zipcode
+    args.zipcode = list(dict.fromkeys(
+        zipcode.strip() for item in raw_zipcodes for zipcode in item.split(',') if zipcode.strip()
+    ))
+    if not args.zipcode:
+        parser.error("no zip codes given")
     
-    while retry_count < args.max_retries and not success:
-        if retry_count > 0:
-            logging.info(f"Retry attempt {retry_count} of {args.max_retries}")
-            time.sleep(args.retry_delay)
-        
-        # Create a new scraper instance for each attempt
-        scraper = None
-        try:
-            scraper = PAGasSwitchExportScraper(output_dir=args.output_dir, headless=args.headless, max_retries=args.max_retries, retry_delay=args.retry_delay)
-            
-            # Run the scraper with the specified zipcode
-            if not scraper.run(args.zipcode):
-                logging.error("Failed to run the scraper")
-                retry_count += 1
-                continue
-            
-            # If we got here, all steps were successful
-            success = True
-            logging.info("Successfully exported and processed data")
+    # Several zip codes are scraped in parallel, each worker with its own browser
+    if len(args.zipcode) > 1:
+        logger.info(f"Starting PA Gas Export Scraper for {len(args.zipcode)} zipcodes with {args.workers} workers")
+        if args.workers > 1:
+            results = scrape_many(
+                args.zipcode,
+                output_dir=args.output_dir,
+                headless=args.headless,
+                max_workers=args.workers,
+                request_delay=args.request_delay,
+                max_retries=args.max_retries,
+                retry_delay=args.retry_delay,
+                block_assets=args.block_assets,
+                debug=args.debug,
+                download_timeout=args.download_timeout
+            )
+        else:
+            # One worker: a single browser visits the zipcodes tab by tab
+            with PAGasSwitchExportScraper(output_dir=args.output_dir, headless=args.headless, max_retries=args.max_retries, retry_delay=args.retry_delay, block_assets=args.block_assets, debug=args.debug, profile_dir=args.profile_dir, download_timeout=args.download_timeout) as scraper:
+                results = scraper.process_zipcodes(args.zipcode)
         
-        except Exception as e:
-            logging.error(f"Unexpected error: {e}")
-            retry_count += 1
+        failed = [zipcode for zipcode, path in results.items() if path is None]
+        if failed:
+            logger.error(f"Failed to export and process data for zipcodes: {', '.join(failed)}")
+            sys.exit(1)
         
-        finally:
-            # Clean up resources
-            if scraper:
-                try:
-                    scraper.driver.quit()
-                    logging.info("Browser closed")
-                except Exception as e:
-                    logging.error(f"Error closing browser: {e}")
+        logger.info("Script completed successfully")
+        sys.exit(0)
+    
+    args.zipcode = args.zipcode[0]
+    logger.info(f"Starting PA Gas Export Scraper for zipcode: {args.zipcode}")
+    logger.info(f"Output directory: {args.output_dir}")
+    logger.info(f"Headless mode: {args.headless}")
+    logger.info(f"Max retries: {args.max_retries}")
+    logger.info(f"Retry delay: {args.retry_delay} seconds")
+    
+    # Create output directory if it doesn't exist
+    os.makedirs(args.output_dir, exist_ok=True)
     
-    if not success:
-        logging.error(f"Failed to export and process data after {args.max_retries} attempts")
-        sys.exit(1)
+    # run() retries on the same browser and closes it when done
+    with PAGasSwitchExportScraper(output_dir=args.output_dir, headless=args.headless, max_retries=args.max_retries, retry_delay=args.retry_delay, block_assets=args.block_assets, debug=args.debug, profile_dir=args.profile_dir, download_timeout=args.download_timeout) as scraper:
+        if not scraper.run(args.zipcode):
+            sys.exit(1)
     
-    logging.info("Script completed successfully")
+    logger.info("Script completed successfully")
     sys.exit(0)
 
 if __name__ == "__main__":
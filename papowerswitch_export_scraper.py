@@ -10,333 +10,565 @@ It then processes the downloaded CSV file to extract and filter the relevant dat
 import os
 import sys
 import time
-import glob
+import queue
+import atexit
+import json
+import gzip
 import shutil
 import logging
 import argparse
+import multiprocessing.util
+import numpy as np
 import pandas as pd
+import requests
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from functools import partial
+from logging.handlers import QueueHandler, QueueListener
+from urllib.parse import quote, urlencode
 from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException, ElementNotInteractableException
-from webdriver_manager.chrome import ChromeDriverManager
+from selenium.common.exceptions import TimeoutException, NoSuchElementException, ElementNotInteractableException, WebDriverException
+
+from output_writer import write_output_atomically
 
 # Create output directory if it doesn't exist
 output_dir = 'output'
 os.makedirs(output_dir, exist_ok=True)
 
-# Set up logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
+def _start_log_listener():
+    """Start a fresh queue and listener thread feeding the log handlers"""
+    global _log_listener
+    _log_queue_handler.queue = queue.SimpleQueue()
+    _log_listener = QueueListener(_log_queue_handler.queue, *_log_handlers, respect_handler_level=True)
+    _log_listener.start()
+
+def _restart_log_listener_in_child():
+    """Give a forked worker its own listener, drained when the worker exits"""
+    _start_log_listener()
+    # Pool workers leave through os._exit, which skips atexit but runs multiprocessing finalizers
+    multiprocessing.util.Finalize(None, _log_listener.stop, exitpriority=10)
+
+# Set up this module's logger with its own handlers, leaving the root logger to the
+# application (records still propagate to it, which is how the app shows progress).
+# As in the gas scraper, log calls only enqueue the record and a listener thread writes it.
+logger = logging.getLogger(__name__)
+if not logger.handlers:
+    _formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    _log_handlers = [
         logging.FileHandler(os.path.join(output_dir, "papowerswitch_export_scraper.log")),
         logging.StreamHandler(sys.stdout)
     ]
-)
+    for _handler in _log_handlers:
+        _handler.setFormatter(_formatter)
+    
+    _log_queue_handler = QueueHandler(queue.SimpleQueue())
+    logger.addHandler(_log_queue_handler)
+    logger.setLevel(logging.INFO)
+    
+    _start_log_listener()
+    atexit.register(lambda: _log_listener.stop())
+    if hasattr(os, 'register_at_fork'):
+        os.register_at_fork(after_in_child=_restart_log_listener_in_child)
+
+# URL patterns the browser skips when asset blocking is on; only the results DOM and the CSV matter
+BLOCKED_ASSET_URLS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg",
+    "*.woff", "*.woff2", "*.ttf", "*.mp4",
+    "*google-analytics*", "*googletagmanager*", "*doubleclick*"
+]
+
+def build_chrome_options(output_dir='output', headless=True, block_assets=False):
+    """Build the Chrome options used by the scraper"""
+    chrome_options = Options()
+    if headless:
+        chrome_options.add_argument("--headless=new")
+    
+    # Return from driver.get at DOMContentLoaded; the explicit waits cover the elements we need
+    chrome_options.page_load_strategy = 'eager'
+    
+    # Add additional options for stability
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--disable-extensions")
+    chrome_options.add_argument("--disable-notifications")
+    chrome_options.add_argument("--disable-infobars")
+    chrome_options.add_argument("--start-maximized")
+    if block_assets:
+        chrome_options.add_argument("--blink-settings=imagesEnabled=false")
+    
+    # Set download directory to output directory
+    prefs = {
+        "download.default_directory": os.path.abspath(output_dir),
+        "download.prompt_for_download": False,
+        "download.directory_upgrade": True,
+        "safebrowsing.enabled": False
+    }
+    if block_assets:
+        prefs["profile.managed_default_content_settings.images"] = 2
+    chrome_options.add_experimental_option("prefs", prefs)
+    
+    # Record page events (not network traffic) in the performance log; the download
+    # events in it tell the scraper the moment an export has finished
+    chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    chrome_options.add_experimental_option("perfLoggingPrefs", {"enableNetwork": False, "enablePage": True})
+    
+    return chrome_options
+
+def create_driver(output_dir='output', headless=True, block_assets=False):
+    """
+    Start a Chrome WebDriver configured for the scraper.
+    
+    Exposed so callers can keep one driver alive and pass it to several scraper runs.
+    With block_assets, images, fonts, media and trackers are never fetched.
+    """
+    chrome_options = build_chrome_options(output_dir, headless, block_assets)
+    
+    # Use the system Chrome directly on macOS
+    import platform
+    if platform.system() == 'Darwin':  # macOS
+        chrome_options.binary_location = '/Applications/Google Chrome.app/Contents/MacOS/Google Chrome'
+    
+    # Selenium Manager resolves chromedriver from its local cache, without
+    # webdriver-manager's per-launch cache walk and version check
+    driver = webdriver.Chrome(options=chrome_options)
+    
+    if block_assets:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_ASSET_URLS})
+    
+    # Allow downloads into output_dir with progress events, headless or not
+    try:
+        driver.execute_cdp_cmd("Browser.setDownloadBehavior", {
+            "behavior": "allow",
+            "downloadPath": os.path.abspath(output_dir),
+            "eventsEnabled": True
+        })
+    except WebDriverException as e:
+        logger.warning(f"Could not set download behavior, relying on download preferences: {e}")
+    
+    driver.set_page_load_timeout(60)
+    driver.set_script_timeout(60)
+    
+    return driver
+
+# Export columns left out of the filtered data
+DROPPED_COLUMNS = ['PA Wind', 'Renewable Energy', 'Contact Phone Number']
+
+# Rows kept in the filtered data: (column, required value, log description)
+ROW_FILTERS = [
+    ('Service Type', 'Residential', 'Residential service type'),
+    ('Type', 'Fixed', 'Fixed rate type'),
+    ('Monthly Fee', 'No', 'No monthly fee'),
+]
+
+# The results page's Export to CSV button or link
+EXPORT_BUTTON_XPATH = "//*[self::button or self::a][contains(normalize-space(), 'Export') and contains(normalize-space(), 'CSV')]"
+
+# Columns moved to the front of the filtered data
+PRIORITY_COLUMNS = ['Supplier', 'Price', 'Term Length']
+
+def read_filtered_export(csv_path):
+    """
+    Read an exported CSV and keep only the ROW_FILTERS rows, without DROPPED_COLUMNS
+    and with PRIORITY_COLUMNS first. Returns (DataFrame, row count before filtering).
+    
+    pyarrow parses the file and filters it as an Arrow table, so only the matching
+    rows are converted to pandas (as Arrow-backed columns). Falls back to pandas' own
+    parser if pyarrow is unavailable or rejects the file.
+    """
+    # Names come from pandas so blank headers read as 'Unnamed: N' on either path
+    header = pd.read_csv(csv_path, nrows=0).columns
+    usecols = [col for col in header if col not in DROPPED_COLUMNS]
+    if len(usecols) < len(header):
+        logger.info(f"Removed columns: {', '.join(col for col in header if col in DROPPED_COLUMNS)}")
+    priority_columns = [col for col in PRIORITY_COLUMNS if col in usecols]
+    column_order = priority_columns + [col for col in usecols if col not in priority_columns]
+    logger.info(f"Rearranged columns with priority: {', '.join(priority_columns)}")
+    filters = [(col, value, description) for col, value, description in ROW_FILTERS if col in usecols]
+    
+    try:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.csv as pa_csv
+        table = pa_csv.read_csv(
+            csv_path,
+            read_options=pa_csv.ReadOptions(column_names=list(header), skip_rows=1),
+            # Blank and 'nan' cells are null, as pandas reads them; filter columns are
+            # read as strings even if blank throughout
+            convert_options=pa_csv.ConvertOptions(
+                include_columns=column_order,
+                column_types={col: pa.string() for col, _, _ in filters},
+                strings_can_be_null=True
+            )
+        )
+    except (ImportError, ValueError) as e:
+        # pyarrow's parse errors (ArrowInvalid) are ValueErrors too
+        logger.warning(f"Reading CSV with pyarrow failed ({e}), using the default parser")
+        df = pd.read_csv(csv_path, usecols=usecols)
+        mask = np.ones(len(df), dtype=bool)
+        for col, value, description in filters:
+            mask &= (df[col] == value).to_numpy(dtype=bool, na_value=False)
+            logger.info(f"Filtered for {description} ({mask.sum()} rows left)")
+        return df.loc[mask, column_order].copy(), len(df)
+    
+    # A blank cell is null in the table; it counts as not matching
+    mask = None
+    for col, value, description in filters:
+        matches = pc.fill_null(pc.equal(table[col], value), False)
+        mask = matches if mask is None else pc.and_(mask, matches)
+        logger.info(f"Filtered for {description} ({pc.sum(mask).as_py() or 0} rows left)")
+    filtered = table.filter(mask) if mask is not None else table
+    return filtered.to_pandas(types_mapper=pd.ArrowDtype), table.num_rows
+
+def build_results_url(zipcode):
+    """
+    Build the results page URL with all filters pre-set for direct navigation.
+    
+    The zipcode is passed through urlencode like every other parameter rather than
+    spliced into the URL text, so it can't alter the rest of the query.
+    """
+    params = [
+        ('zip', zipcode),
+        ('distributor', '1182'),
+        ('distributorrate', 'R - Regular Residential Service'),
+        ('servicetype', 'residential'),
+        ('usage', '700'),
+        ('min-price', ''),
+        ('max-price', ''),
+        ('ratePreferences[]', 'fixed'),
+        ('offerPreferences[]', 'no_cancellation'),
+        ('offerPreferences[]', 'no_enrollment'),
+        ('offerPreferences[]', 'no_monthly'),
+        ('offerPreferences[]', 'introductory_prices'),
+        ('sortby', 'est_a')
+    ]
+    return f"https://www.papowerswitch.com/shop-for-rates-results?{urlencode(params, quote_via=quote)}"
 
 class PAPowerSwitchExportScraper:
-    def __init__(self, output_dir='output', headless=True, max_retries=3, retry_delay=5, zipcode='19348'):
+    def __init__(self, output_dir='output', headless=True, max_retries=3, retry_delay=5, zipcode='19348', driver=None, output_format='csv', download_dir=None, block_assets=False, debug=False, download_timeout=30):
         """Initialize the scraper with configuration options"""
         # Base URL with all parameters pre-set for direct navigation
-        self.base_url = f"https://www.papowerswitch.com/shop-for-rates-results?zip={zipcode}&distributor=1182&distributorrate=R%20-%20Regular%20Residential%20Service&servicetype=residential&usage=700&min-price=&max-price=&ratePreferences%5B%5D=fixed&offerPreferences%5B%5D=no_cancellation&offerPreferences%5B%5D=no_enrollment&offerPreferences%5B%5D=no_monthly&offerPreferences%5B%5D=introductory_prices&sortby=est_a"
+        self.base_url = build_results_url(zipcode)
         self.output_dir = output_dir
         self.headless = headless
         self.max_retries = max_retries
         self.retry_delay = retry_delay
+        self.block_assets = block_assets
+        # Screenshots and page sources on the happy path; failures always save them
+        self.debug = debug
+        # Seconds to wait for an export click's CSV to finish downloading
+        self.download_timeout = download_timeout
         self.timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         self.zipcode = zipcode
         
-        # Create output directory if it doesn't exist
-        os.makedirs(self.output_dir, exist_ok=True)
+        # Filtered data is written as 'csv' or 'parquet' (smaller and faster to load)
+        self.output_format = output_format
         
-        # Set up Chrome options
-        self.chrome_options = Options()
-        if self.headless:
-            self.chrome_options.add_argument("--headless=new")
+        # Path of the filtered file written by the last successful run
+        self.filtered_path = None
         
-        # Add additional options for stability
-        self.chrome_options.add_argument("--no-sandbox")
-        self.chrome_options.add_argument("--disable-dev-shm-usage")
-        self.chrome_options.add_argument("--disable-gpu")
-        self.chrome_options.add_argument("--disable-extensions")
-        self.chrome_options.add_argument("--disable-notifications")
-        self.chrome_options.add_argument("--disable-infobars")
-        self.chrome_options.add_argument("--start-maximized")
+        # Path of the CSV the last export click downloaded
+        self.downloaded_csv = None
         
-        # Set download directory to output directory
-        prefs = {
-            "download.default_directory": os.path.abspath(self.output_dir),
-            "download.prompt_for_download": False,
-            "download.directory_upgrade": True,
-            "safebrowsing.enabled": False
-        }
-        self.chrome_options.add_experimental_option("prefs", prefs)
+        # Create output directory if it doesn't exist
+        os.makedirs(self.output_dir, exist_ok=True)
+        
+        # Chrome saves the export here; the output directory unless given (parallel
+        # workers each need their own so they can't pick up each other's downloads)
+        self.download_dir = download_dir or self.output_dir
+        os.makedirs(self.download_dir, exist_ok=True)
         
-        # Initialize driver to None (will be set up later)
-        self.driver = None
+        # Use the caller's driver if given (e.g. one kept alive across runs), otherwise
+        # one is started on first use and kept across retries and zipcodes until close()
+        self.driver = driver
+        self.owns_driver = driver is None
         
-        logging.info("PA Power Switch Export Scraper initialized")
-        logging.info(f"Output directory: {self.output_dir}")
-        logging.info(f"Headless mode: {self.headless}")
-        logging.info(f"Max retries: {self.max_retries}")
-        logging.info(f"Retry delay: {self.retry_delay} seconds")
-        logging.info(f"Zipcode: {self.zipcode}")
+        logger.info("PA Power Switch Export Scraper initialized")
+        logger.info(f"Output directory: {self.output_dir}")
+        logger.info(f"Headless mode: {self.headless}")
+        logger.info(f"Max retries: {self.max_retries}")
+        logger.info(f"Retry delay: {self.retry_delay} seconds")
+        logger.info(f"Asset blocking: {self.block_assets}")
+        logger.info(f"Zipcode: {self.zipcode}")
     
     def setup_driver(self):
         """Set up the Chrome WebDriver"""
         try:
-            # Use a different approach for macOS
-            import platform
-            if platform.system() == 'Darwin':  # macOS
-                # Try to use the system Chrome directly
-                self.chrome_options.binary_location = '/Applications/Google Chrome.app/Contents/MacOS/Google Chrome'
-                driver = webdriver.Chrome(options=self.chrome_options)
-            else:
-                # Use webdriver-manager for other platforms
-                service = Service(ChromeDriverManager().install())
-                driver = webdriver.Chrome(service=service, options=self.chrome_options)
-            
-            driver.set_page_load_timeout(60)
-            driver.set_script_timeout(60)
-            
-            logging.info("Chrome WebDriver set up successfully")
+            driver = create_driver(self.download_dir, self.headless, self.block_assets)
+            logger.info("Chrome WebDriver set up successfully")
             return driver
         except Exception as e:
-            logging.error(f"Error setting up Chrome WebDriver: {e}")
+            logger.error(f"Error setting up Chrome WebDriver: {e}")
             return None
     
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+    
+    def _browser_alive(self):
+        """Whether the browser still answers commands"""
+        try:
+            self.driver.window_handles
+            return True
+        except WebDriverException:
+            return False
+    
+    def close(self):
+        """Quit the browser unless it belongs to the caller"""
+        if not self.owns_driver or self.driver is None:
+            return
+        
+        driver, self.driver = self.driver, None
+        try:
+            driver.quit()
+            logger.info("Chrome WebDriver closed")
+        except Exception as e:
+            logger.error(f"Error closing Chrome WebDriver: {e}")
+    
     def take_screenshot(self, name):
         """Take a screenshot for debugging purposes"""
         if self.driver:
             screenshot_path = os.path.join(self.output_dir, f"{name}_{self.timestamp}.png")
             self.driver.save_screenshot(screenshot_path)
-            logging.info(f"Screenshot saved to {screenshot_path}")
+            logger.info(f"Screenshot saved to {screenshot_path}")
     
     def save_page_source(self, name):
-        """Save the page source for debugging purposes"""
+        """Save the page source, gzip-compressed, for debugging purposes"""
         if self.driver:
-            source_path = os.path.join(self.output_dir, f"{name}_{self.timestamp}.html")
-            with open(source_path, 'w', encoding='utf-8') as f:
+            source_path = os.path.join(self.output_dir, f"{name}_{self.timestamp}.html.gz")
+            # HTML shrinks about tenfold even at the fastest compression level
+            with gzip.open(source_path, 'wt', encoding='utf-8', compresslevel=1) as f:
                 f.write(self.driver.page_source)
-            logging.info(f"Page source saved to {source_path}")
+            logger.info(f"Page source saved to {source_path}")
     
     def navigate_to_website(self):
         """Navigate directly to the results page with all filters applied"""
         try:
-            logging.info(f"Navigating directly to results page with URL: {self.base_url}")
+            logger.info(f"Navigating directly to results page with URL: {self.base_url}")
             self.driver.get(self.base_url)
             
-            # Wait for the page to load
-            WebDriverWait(self.driver, 30).until(
-                EC.presence_of_element_located((By.TAG_NAME, "body"))
-            )
-            
-            # Wait for the results to load
+            # driver.get returns at DOMContentLoaded; wait for the results to load
             WebDriverWait(self.driver, 60).until(
                 EC.presence_of_element_located((By.CSS_SELECTOR, ".supplier-offer, .offer, .rate-card, table"))
             )
             
-            logging.info("Successfully navigated to the results page")
-            self.take_screenshot("results_page")
-            self.save_page_source("results_page")
+            logger.info("Successfully navigated to the results page")
+            if self.debug:
+                self.take_screenshot("results_page")
+                self.save_page_source("results_page")
             return True
         except Exception as e:
-            logging.error(f"Error navigating to results page: {e}")
+            logger.error(f"Error navigating to results page: {e}")
             self.take_screenshot("navigation_error")
             return False
     
     def click_export_button(self):
         """Click the 'Export to CSV' button"""
         try:
-            logging.info("Looking for Export to CSV button")
+            logger.info("Looking for Export to CSV button")
             
-            # Wait for the page to be fully loaded
-            time.sleep(3)
-            
-            # Try multiple approaches to find the Export to CSV button
+            # navigate_to_website has already waited for the results; the lookup below
+            # waits for the button itself
             export_button = None
             
-            # Approach 1: Look for text "Export to CSV" near "Print Results"
+            # One query covers every way the button has been labelled (plain text, or
+            # text split across child elements), waiting until it can be clicked
             try:
-                # First find the Print Results button
-                print_button = WebDriverWait(self.driver, 10).until(
-                    EC.presence_of_element_located((By.XPATH, "//button[contains(text(), 'Print Results')] | //a[contains(text(), 'Print Results')]"))
+                export_button = WebDriverWait(self.driver, 15, poll_frequency=0.2).until(
+                    EC.element_to_be_clickable((By.XPATH, EXPORT_BUTTON_XPATH))
                 )
-                
-                # Then find the Export to CSV button which should be nearby
-                export_button = self.driver.find_element(By.XPATH, 
-                    "//button[contains(text(), 'Export to CSV')] | //a[contains(text(), 'Export to CSV')]")
-                
-                logging.info("Found Export to CSV button using text search near Print Results")
-            except Exception as e:
-                logging.warning(f"Could not find Export button near Print Results: {e}")
+                logger.info("Found Export to CSV button")
+            except TimeoutException:
+                logger.warning("Could not find a clickable Export to CSV button")
             
-            # Approach 2: Direct XPath search
-            if not export_button:
-                try:
-                    export_button = WebDriverWait(self.driver, 10).until(
-                        EC.presence_of_element_located((By.XPATH, 
-                            "//button[contains(text(), 'Export to CSV')] | //a[contains(text(), 'Export to CSV')]"))
-                    )
-                    logging.info("Found Export to CSV button using direct XPath search")
-                except Exception as e:
-                    logging.warning(f"Could not find Export button with direct XPath: {e}")
-            
-            # Approach 3: Look for any element containing "Export" and "CSV"
-            if not export_button:
-                try:
-                    export_button = WebDriverWait(self.driver, 10).until(
-                        EC.presence_of_element_located((By.XPATH, 
-                            "//*[contains(text(), 'Export') and contains(text(), 'CSV')]"))
-                    )
-                    logging.info("Found Export to CSV button using partial text search")
-                except Exception as e:
-                    logging.warning(f"Could not find Export button with partial text: {e}")
+            # A plain link to the export can be fetched with the browser's session directly,
+            # skipping the click, Chrome's download and the wait for it
+            if export_button and self._fetch_export_link(export_button):
+                return True
             
             if export_button:
-                # Scroll to the export button to make sure it's visible
-                self.driver.execute_script("arguments[0].scrollIntoView(true);", export_button)
-                
                 # Take a screenshot before clicking
-                self.take_screenshot("before_export_click")
+                if self.debug:
+                    self.take_screenshot("before_export_click")
+                
+                # Note what is already in the download directory so the new file stands out
+                files_before = set(os.listdir(self.download_dir))
+                
+                # Reading the performance log empties it, so only this export's download
+                # events are seen below; a driver without the log can't report downloads
+                try:
+                    self.driver.get_log('performance')
+                    has_download_events = True
+                except WebDriverException:
+                    has_download_events = False
                 
                 # Try to click directly
                 try:
                     export_button.click()
-                    logging.info("Clicked Export to CSV button")
+                    logger.info("Clicked Export to CSV button")
                 except Exception as click_error:
-                    logging.warning(f"Direct click failed: {click_error}")
+                    logger.warning(f"Direct click failed: {click_error}")
                     # If direct click fails, try JavaScript click
                     try:
                         self.driver.execute_script("arguments[0].click();", export_button)
-                        logging.info("Clicked Export to CSV button using JavaScript")
+                        logger.info("Clicked Export to CSV button using JavaScript")
                     except Exception as js_error:
-                        logging.error(f"JavaScript click also failed: {js_error}")
+                        logger.error(f"JavaScript click also failed: {js_error}")
                         return False
                 
                 # Wait for the download to complete
-                time.sleep(10)
+                self.downloaded_csv = self._await_download(files_before, has_download_events)
+                if not self.downloaded_csv:
+                    logger.error(f"No CSV download finished within {self.download_timeout} seconds")
+                    return False
                 
-                logging.info("Export to CSV button clicked successfully")
+                logger.info(f"Export to CSV button clicked successfully, downloaded {self.downloaded_csv}")
                 return True
             else:
-                logging.error("Export to CSV button not found")
+                logger.error("Export to CSV button not found")
                 self.take_screenshot("export_button_not_found")
                 self.save_page_source("export_button_not_found")
                 return False
         except Exception as e:
-            logging.error(f"Error clicking Export to CSV button: {e}")
+            logger.error(f"Error clicking Export to CSV button: {e}")
             self.take_screenshot("export_button_error")
             return False
     
-    def find_latest_csv_file(self):
-        """Find the most recently downloaded CSV file in the output directory"""
+    def _fetch_export_link(self, export_button):
+        """
+        Download the export over HTTP if the button is a link to it, saving it in the
+        download directory as the browser would. Returns False (so the caller clicks
+        instead) when the button isn't a plain link or the response isn't a CSV.
+        """
+        href = export_button.get_attribute('href')
+        if not href or not href.startswith(('http://', 'https://')):
+            return False
+        
         try:
-            # Look for CSV files in the output directory
-            csv_files = glob.glob(os.path.join(self.output_dir, "*.csv"))
-            
-            if not csv_files:
-                logging.error("No CSV files found in the output directory")
-                return None
-            
-            # Get the most recently modified file
-            latest_file = max(csv_files, key=os.path.getmtime)
-            
-            # Check if the file was created/modified in the last minute
-            file_mtime = os.path.getmtime(latest_file)
-            current_time = time.time()
-            
-            if current_time - file_mtime > 60:
-                logging.warning(f"Latest CSV file ({latest_file}) is older than 1 minute")
-            
-            logging.info(f"Found latest CSV file: {latest_file}")
-            return latest_file
-        except Exception as e:
-            logging.error(f"Error finding latest CSV file: {e}")
-            return None
+            # Reuse the browser's session so the site sees the same visitor
+            session = requests.Session()
+            session.headers['User-Agent'] = self.driver.execute_script("return navigator.userAgent;")
+            for cookie in self.driver.get_cookies():
+                session.cookies.set(cookie['name'], cookie['value'], domain=cookie.get('domain'), path=cookie.get('path', '/'))
+            
+            response = session.get(href, timeout=30)
+            response.raise_for_status()
+        except (requests.RequestException, WebDriverException) as e:
+            logger.warning(f"Fetching the export link failed, clicking the button instead: {e}")
+            return False
+        
+        # The export's header row names the supplier column; anything else is an error page
+        if b'Supplier' not in response.content.split(b'\n', 1)[0]:
+            logger.warning("Export link did not return the CSV, clicking the button instead")
+            return False
+        
+        # Written under a temporary name so a half-written file is never picked up
+        csv_path = os.path.join(self.download_dir, f"papowerswitch_direct_{self.zipcode}_{self.timestamp}.csv")
+        tmp_path = os.path.join(self.download_dir, f".tmp_{os.getpid()}_{os.path.basename(csv_path)}")
+        with open(tmp_path, 'wb') as f:
+            f.write(response.content)
+        os.replace(tmp_path, csv_path)
+        
+        self.downloaded_csv = csv_path
+        logger.info(f"Downloaded export directly from {href}")
+        return True
+    
+    def _await_download(self, files_before, has_download_events):
+        """
+        Return the path of the CSV the export click downloaded, or None if none finished
+        within download_timeout. Checks every 100ms.
+        
+        The directory diff (_finished_download) names the file. Chrome's download events,
+        where the driver logs them, only hold that check back while a started download is
+        still in progress; if no event ever arrives the directory check decides alone.
+        """
+        guids = set()
+        
+        def downloaded(driver):
+            if has_download_events:
+                for entry in driver.get_log('performance'):
+                    event = json.loads(entry['message'])['message']
+                    params = event.get('params', {})
+                    if event.get('method') == 'Page.downloadWillBegin':
+                        guids.add(params['guid'])
+                        logger.info(f"Download started: {params.get('suggestedFilename')}")
+                    elif event.get('method') == 'Page.downloadProgress' and params.get('guid') in guids:
+                        if params.get('state') == 'canceled':
+                            raise RuntimeError("Export download was canceled")
+                        if params.get('state') == 'completed':
+                            guids.discard(params['guid'])
+            # A download Chrome reported starting isn't done until it reports completion
+            return not guids and self._finished_download(files_before)
+        
+        try:
+            return WebDriverWait(self.driver, self.download_timeout, poll_frequency=0.1).until(downloaded)
+        except TimeoutException:
+            # The completion event may never have been logged; the file may still be there
+            return self._finished_download(files_before) or None
+    
+    def _finished_download(self, files_before):
+        """
+        Return the path of a CSV that wasn't in files_before, once Chrome has no
+        download in progress (.crdownload) in the directory; False until then.
+        """
+        new_files = set(os.listdir(self.download_dir)) - files_before
+        if any(name.endswith('.crdownload') for name in new_files):
+            return False
+        new_csvs = [name for name in new_files if name.endswith('.csv') and not name.startswith('.tmp_')]
+        return os.path.join(self.download_dir, new_csvs[0]) if new_csvs else False
     
     def process_csv_file(self, csv_file, zipcode):
         """Process the downloaded CSV file"""
         try:
             if not csv_file or not os.path.exists(csv_file):
-                logging.error("CSV file not found")
+                logger.error("CSV file not found")
                 return False
             
-            logging.info(f"Processing CSV file: {csv_file}")
-            
-            # Read the CSV file
-            df = pd.read_csv(csv_file)
+            logger.info(f"Processing CSV file: {csv_file}")
             
-            # Store the original row count
-            original_row_count = len(df)
-            logging.info(f"Original CSV file has {original_row_count} rows")
-            
-            # Copy the original file with timestamp
-            export_filename = f"papowerswitch_export_{self.timestamp}.csv"
+            # Keep the original file under a name with the timestamp. The download itself
+            # becomes that file (a rename, no copy) unless it's on another filesystem
+            export_filename = f"papowerswitch_export_{zipcode}_{self.timestamp}.csv"
             export_path = os.path.join(self.output_dir, export_filename)
-            shutil.copy2(csv_file, export_path)
-            logging.info(f"Original CSV file copied to: {export_path}")
-            
-            # Remove specified columns if they exist
-            columns_to_remove = ['PA Wind', 'Renewable Energy', 'Contact Phone Number']
-            removed_columns = []
-            for col in columns_to_remove:
-                if col in df.columns:
-                    df = df.drop(columns=[col])
-                    removed_columns.append(col)
-            
-            if removed_columns:
-                logging.info(f"Removed columns: {', '.join(removed_columns)}")
-            
-            # Apply filters
-            if 'Service Type' in df.columns:
-                df = df[df['Service Type'] == 'Residential']
-                logging.info("Filtered for Residential service type")
-            
-            if 'Type' in df.columns:
-                df = df[df['Type'] == 'Fixed']
-                logging.info("Filtered for Fixed rate type")
+            try:
+                os.replace(csv_file, export_path)
+                logger.info(f"Original CSV file moved to: {export_path}")
+            except OSError:
+                shutil.copy2(csv_file, export_path)
+                logger.info(f"Original CSV file copied to: {export_path}")
             
-            if 'Monthly Fee' in df.columns:
-                df = df[df['Monthly Fee'] == 'No']
-                logging.info("Filtered for No monthly fee")
+            # Read and filter the CSV file, leaving out the columns that would be removed anyway
+            df, original_row_count = read_filtered_export(export_path)
+            logger.info(f"Original CSV file has {original_row_count} rows")
             
             # Convert Price to numeric for sorting, handling non-numeric values
             if 'Price' in df.columns:
                 df['Price'] = pd.to_numeric(df['Price'], errors='coerce')
-                df = df.sort_values(by='Price').reset_index(drop=True)
-                logging.info("Sorted data by Price (ascending)")
-            
-            # Rearrange columns to put Supplier, Price, Term Length first
-            all_columns = df.columns.tolist()
-            priority_columns = ['Supplier', 'Price', 'Term Length']
-            
-            # Filter out priority columns that actually exist in the DataFrame
-            existing_priority_columns = [col for col in priority_columns if col in all_columns]
-            
-            # Get remaining columns (excluding priority columns)
-            remaining_columns = [col for col in all_columns if col not in existing_priority_columns]
+                # One numeric key, so a stable NumPy argsort does; missing prices sort last as NaN
+                prices = df['Price'].to_numpy(dtype=np.float64, na_value=np.nan)
+                df = df.take(np.argsort(prices, kind='stable')).reset_index(drop=True)
+                logger.info("Sorted data by Price (ascending)")
             
-            # Reorder columns
-            df = df[existing_priority_columns + remaining_columns]
-            logging.info(f"Rearranged columns with priority: {', '.join(existing_priority_columns)}")
-            
-            # Save the filtered data to a new CSV file
-            filtered_filename = f"papowerswitch_filtered_{zipcode}_{self.timestamp}.csv"
+            # Save the filtered data to a new file
+            filtered_filename = f"papowerswitch_filtered_{zipcode}_{self.timestamp}.{self.output_format}"
             filtered_path = os.path.join(self.output_dir, filtered_filename)
-            df.to_csv(filtered_path, index=False)
+            write_output_atomically(df, filtered_path, self.output_format)
+            self.filtered_path = filtered_path
             
-            logging.info(f"Filtered CSV file saved to: {filtered_path}")
-            logging.info(f"Original row count: {original_row_count}, Filtered row count: {len(df)}")
+            logger.info(f"Filtered {self.output_format.upper()} file saved to: {filtered_path}")
+            logger.info(f"Original row count: {original_row_count}, Filtered row count: {len(df)}")
             
             return True
         except Exception as e:
-            logging.error(f"Error processing CSV file: {e}")
+            logger.error(f"Error processing CSV file: {e}")
             return False
     
     def run(self, zipcode):
@@ -345,91 +577,323 @@ class PAPowerSwitchExportScraper:
         
         # Update the base URL with the provided zipcode
         self.zipcode = zipcode
-        self.base_url = f"https://www.papowerswitch.com/shop-for-rates-results?zip={zipcode}&distributor=1182&distributorrate=R%20-%20Regular%20Residential%20Service&servicetype=residential&usage=700&min-price=&max-price=&ratePreferences%5B%5D=fixed&offerPreferences%5B%5D=no_cancellation&offerPreferences%5B%5D=no_enrollment&offerPreferences%5B%5D=no_monthly&offerPreferences%5B%5D=introductory_prices&sortby=est_a"
+        self.base_url = build_results_url(zipcode)
         
         for attempt in range(1, self.max_retries + 1):
             try:
-                logging.info(f"Attempt {attempt} of {self.max_retries}")
+                logger.info(f"Attempt {attempt} of {self.max_retries}")
                 
-                # Set up the driver
-                self.driver = self.setup_driver()
+                # Set up the driver unless one was supplied by the caller or is still
+                # open from an earlier attempt or zipcode
                 if not self.driver:
-                    logging.error("Failed to set up WebDriver")
+                    self.driver = self.setup_driver()
+                if not self.driver:
+                    logger.error("Failed to set up WebDriver")
                     continue
                 
+                # Start from a clean session when the browser has been used before
+                self.driver.delete_all_cookies()
+                
                 # Navigate directly to the results page
                 if not self.navigate_to_website():
-                    logging.error("Failed to navigate to results page")
+                    logger.error("Failed to navigate to results page")
                     continue
                 
                 # Click the export button
                 if not self.click_export_button():
-                    logging.error("Failed to click export button")
+                    logger.error("Failed to click export button")
                     continue
                 
-                # Find the latest CSV file
-                csv_file = self.find_latest_csv_file()
-                if not csv_file:
-                    logging.error("Failed to find CSV file")
-                    continue
-                
-                # Process the CSV file
+                # Process the CSV file the export just downloaded
+                csv_file = self.downloaded_csv
                 if not self.process_csv_file(csv_file, zipcode):
-                    logging.error("Failed to process CSV file")
+                    logger.error("Failed to process CSV file")
                     continue
                 
                 # If we got here, everything was successful
                 success = True
-                logging.info("Scraper completed successfully")
+                logger.info("Scraper completed successfully")
                 break
             
             except Exception as e:
-                logging.error(f"Error during scraping: {e}")
+                logger.error(f"Error during scraping: {e}")
                 self.take_screenshot(f"error_attempt_{attempt}")
                 self.save_page_source(f"error_attempt_{attempt}")
             
             finally:
-                # Close the driver
-                if self.driver:
-                    self.driver.quit()
-                    self.driver = None
+                # Keep the browser for the next attempt, unless it has died
+                if not success and self.driver and self.owns_driver and not self._browser_alive():
+                    logger.warning("Browser stopped responding, starting a new one for the next attempt")
+                    self.close()
             
             # Wait before retrying
             if attempt < self.max_retries and not success:
-                logging.info(f"Waiting {self.retry_delay} seconds before retrying...")
+                logger.info(f"Waiting {self.retry_delay} seconds before retrying...")
                 time.sleep(self.retry_delay)
         
         return success
+    
+    def process_zipcodes(self, zipcodes):
+        """
+        Scrape several zipcodes with this one browser, each in a fresh tab.
+        
+        Returns a dict mapping each zipcode to its filtered output path, or to
+        None where that zipcode failed.
+        """
+        results = {}
+        home_tab = None
+        for zipcode in zipcodes:
+            self.filtered_path = None
+            
+            # (Re)start the browser if there is none, e.g. after a dead one was closed
+            if not self.driver:
+                self.driver = self.setup_driver()
+                home_tab = None
+            if not self.driver:
+                results[zipcode] = None
+                continue
+            if home_tab is None:
+                home_tab = self.driver.current_window_handle
+            
+            # A new tab starts from clean page state without paying for a new Chrome
+            tab_driver = self.driver
+            tab_driver.switch_to.new_window('tab')
+            try:
+                success = self.run(zipcode)
+                results[zipcode] = self.filtered_path if success else None
+            finally:
+                if self.driver is tab_driver:
+                    self.driver.close()
+                    self.driver.switch_to.window(home_tab)
+                else:
+                    # The browser was replaced during the retries; its tab is the new home
+                    home_tab = None
+        
+        return results
+
+def scrape(zipcode, output_dir='output', headless=True, driver=None, output_format='parquet', download_dir=None):
+    """
+    Scrape electricity rates for a zipcode in-process and return the filtered file path.
+    
+    Lets callers such as the Streamlit app reuse the already-imported module
+    instead of spawning a new Python interpreter per fetch. Pass a driver from
+    create_driver() to reuse one browser across calls. Output defaults to
+    Parquet since in-process callers load it straight back into a DataFrame.
+    A passed driver must download into download_dir (the output directory if None).
+    """
+    with PAPowerSwitchExportScraper(
+        output_dir=output_dir,
+        headless=headless,
+        zipcode=zipcode,
+        driver=driver,
+        output_format=output_format,
+        download_dir=download_dir
+    ) as scraper:
+        if not scraper.run(zipcode):
+            raise RuntimeError(f"Failed to scrape electricity rate data for zipcode {zipcode}")
+        
+        return scraper.filtered_path
+
+# Per worker process: when this worker last started a scrape, and its scraper, whose
+# browser is kept for every zipcode the worker handles
+_last_request_time = 0.0
+_worker_scraper = None
+
+def _scrape_one(zipcode, output_dir='output', headless=True, max_retries=3, retry_delay=5, request_delay=0.0, output_format='csv', block_assets=False, debug=False, download_timeout=30):
+    """
+    Scrape one zipcode inside a pool worker and return the filtered output path, or None.
+    
+    The worker's first call starts its scraper, downloading into a directory of its own
+    so concurrent exports can't be mistaken for one another; the browser is closed and
+    the directory removed when the worker exits.
+    """
+    global _last_request_time, _worker_scraper
+    
+    # Keep at least request_delay seconds between this worker's visits to the site
+    remaining = _last_request_time + request_delay - time.monotonic()
+    if remaining > 0:
+        time.sleep(remaining)
+    _last_request_time = time.monotonic()
+    
+    try:
+        if _worker_scraper is None:
+            download_dir = os.path.join(os.path.abspath(output_dir), f"worker_{os.getpid()}")
+            _worker_scraper = PAPowerSwitchExportScraper(output_dir=output_dir, headless=headless, max_retries=max_retries, retry_delay=retry_delay, output_format=output_format, download_dir=download_dir, block_assets=block_assets, debug=debug, download_timeout=download_timeout)
+            multiprocessing.util.Finalize(None, _worker_scraper.close, exitpriority=10)
+            # Lower priority, so this runs once the browser is closed; the raw exports
+            # have already been moved to output_dir
+            multiprocessing.util.Finalize(None, shutil.rmtree, args=(download_dir,), kwargs={'ignore_errors': True}, exitpriority=5)
+        
+        if not _worker_scraper.run(zipcode):
+            logger.error(f"Failed to scrape zipcode {zipcode}")
+            return None
+        
+        return _worker_scraper.filtered_path
+    except Exception as e:
+        logger.error(f"Unexpected error scraping zipcode {zipcode}: {e}")
+        return None
+
+def scrape_many(zipcodes, output_dir='output', headless=True, max_workers=4, request_delay=0.0, max_retries=3, retry_delay=5, output_format='csv', block_assets=False, debug=False, download_timeout=30):
+    """
+    Scrape several zipcodes in parallel, one Chrome instance per worker process.
+    
+    Returns a dict mapping each zipcode to its filtered output path, or to None
+    where that zipcode failed.
+    """
+    worker = partial(
+        _scrape_one,
+        output_dir=output_dir,
+        headless=headless,
+        max_retries=max_retries,
+        retry_delay=retry_delay,
+        request_delay=request_delay,
+        output_format=output_format,
+        block_assets=block_assets,
+        debug=debug,
+        download_timeout=download_timeout
+    )
+    
+    with ProcessPoolExecutor(max_workers=min(max_workers, len(zipcodes))) as executor:
+        return dict(zip(zipcodes, executor.map(worker, zipcodes)))
+
+def write_combined_output(results, path):
+    """
+    Gather the filtered files in results (zipcode -> path, or None where it failed) into
+    one zstd-compressed Parquet file with a leading zipcode column.
+    
+    Returns the number of zipcodes written; nothing is written if none succeeded.
+    """
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+    
+    tables = []
+    for zipcode, filtered_path in results.items():
+        if not filtered_path:
+            continue
+        if filtered_path.endswith('.parquet'):
+            table = pq.read_table(filtered_path)
+        else:
+            table = pa_csv.read_csv(filtered_path, convert_options=pa_csv.ConvertOptions(strings_can_be_null=True))
+        tables.append(table.add_column(0, 'zipcode', pa.array([zipcode] * table.num_rows, pa.string())))
+    if not tables:
+        return 0
+    
+    # Columns missing for some zipcodes are filled with nulls and compatible types widened;
+    # if a column was read as incompatible types (text in one export, numbers in another)
+    # every column is stored as text
+    try:
+        combined = pa.concat_tables(tables, promote_options='permissive')
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        tables = [table.cast(pa.schema([(name, pa.string()) for name in table.column_names])) for table in tables]
+        combined = pa.concat_tables(tables, promote_options='permissive')
+    
+    # Written under a temporary name so a half-written file is never picked up
+    tmp_path = os.path.join(os.path.dirname(path), f".tmp_{os.getpid()}_{os.path.basename(path)}")
+    try:
+        pq.write_table(combined, tmp_path, compression='zstd')
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    
+    return len(tables)
 
 def main():
     """Main function to run the scraper"""
     parser = argparse.ArgumentParser(description='Scrape PA Power Switch website for electricity offers using Export to CSV')
-    parser.add_argument('--zipcode', type=str, required=True, help='Zip code to search for')
+    zipcode_source = parser.add_mutually_exclusive_group(required=True)
+    zipcode_source.add_argument('--zipcode', type=str, nargs='+', help='Zip code(s) to search for, space or comma separated')
+    zipcode_source.add_argument('--zipcodes-file', type=str, help='File listing zip codes, separated by whitespace or commas')
     parser.add_argument('--output-dir', type=str, default='output', help='Directory to save output files')
     parser.add_argument('--headless', action='store_true', help='Run in headless mode (no browser UI)')
     parser.add_argument('--max-retries', type=int, default=3, help='Maximum number of retry attempts')
     parser.add_argument('--retry-delay', type=int, default=5, help='Delay between retry attempts in seconds')
+    parser.add_argument('--workers', type=int, default=4, help='Browser processes to run when scraping several zip codes')
+    parser.add_argument('--request-delay', type=float, default=0.0, help='Minimum seconds between zip codes in each worker')
+    parser.add_argument('--block-assets', action='store_true', help='Skip loading images, fonts, media and trackers (debug screenshots lose them too)')
+    parser.add_argument('--download-timeout', type=int, default=30, help='Seconds to wait for the exported CSV to download')
+    parser.add_argument('--debug', action='store_true', help='Save a screenshot and the page source on success as well as on errors')
+    parser.add_argument('--combined-output', type=str, help='Also gather every zip code\'s filtered data into this Parquet file, with a zipcode column')
     args = parser.parse_args()
     
-    logging.info(f"Starting PA Power Switch Export Scraper for zipcode: {args.zipcode}")
+    # Accept "19103,15213" as well as separate arguments, and drop repeats
+    if args.zipcodes_file:
+        with open(args.zipcodes_file) as f:
+            raw_zipcodes = f.read().split()
+    else:
+        raw_zipcodes = args.zipcode
+    zipcodes = list(dict.fromkeys(
+        zipcode.strip() for item in raw_zipcodes for zipcode in item.split(',') if zipcode.strip()
+    ))
+    if not zipcodes:
+        parser.error("no zip codes given")
     
-    # Initialize and run the scraper
-    scraper = PAPowerSwitchExportScraper(
+    # Several zip codes are scraped in parallel, each worker with its own browser
+    if len(zipcodes) > 1:
+        logger.info(f"Starting PA Power Switch Export Scraper for {len(zipcodes)} zipcodes with {args.workers} workers")
+        if args.workers > 1:
+            results = scrape_many(
+                zipcodes,
+                output_dir=args.output_dir,
+                headless=args.headless,
+                max_workers=args.workers,
+                request_delay=args.request_delay,
+                max_retries=args.max_retries,
+                retry_delay=args.retry_delay,
+                block_assets=args.block_assets,
+                debug=args.debug,
+                download_timeout=args.download_timeout
+            )
+        else:
+            # One worker: a single browser visits the zipcodes tab by tab
+            with PAPowerSwitchExportScraper(
+                output_dir=args.output_dir,
+                headless=args.headless,
+                max_retries=args.max_retries,
+                retry_delay=args.retry_delay,
+                block_assets=args.block_assets,
+                debug=args.debug,
+                download_timeout=args.download_timeout
+            ) as scraper:
+                results = scraper.process_zipcodes(zipcodes)
+        
+        print("\nElectricity Rate Data Summary:")
+        print("==============================")
+        for zipcode, path in results.items():
+            print(f"{zipcode}: {path or 'failed'}")
+        if args.combined_output:
+            written = write_combined_output(results, args.combined_output)
+            if written:
+                print(f"\nCombined data for {written} zip codes saved to: {args.combined_output}")
+        sys.exit(1 if None in results.values() else 0)
+    
+    args.zipcode = zipcodes[0]
+    logger.info(f"Starting PA Power Switch Export Scraper for zipcode: {args.zipcode}")
+    
+    # Initialize and run the scraper; leaving the block closes the browser
+    with PAPowerSwitchExportScraper(
         output_dir=args.output_dir,
         headless=args.headless,
         max_retries=args.max_retries,
-        retry_delay=args.retry_delay
-    )
-    
-    success = scraper.run(args.zipcode)
+        retry_delay=args.retry_delay,
+        block_assets=args.block_assets,
+        debug=args.debug,
+        download_timeout=args.download_timeout
+    ) as scraper:
+        success = scraper.run(args.zipcode)
     
     if success:
         print("\nElectricity Rate Data Summary:")
         print("==============================")
         print(f"Zipcode: {args.zipcode}")
         print(f"Data successfully exported and processed")
-        print(f"\nResults saved to: {os.path.join(args.output_dir, f'papowerswitch_filtered_{args.zipcode}_{scraper.timestamp}.csv')}")
-        print(f"Original export saved to: {os.path.join(args.output_dir, f'papowerswitch_export_{scraper.timestamp}.csv')}")
+        print(f"\nResults saved to: {scraper.filtered_path}")
+        print(f"Original export saved to: {os.path.join(args.output_dir, f'papowerswitch_export_{args.zipcode}_{scraper.timestamp}.csv')}")
+        if args.combined_output:
+            write_combined_output({args.zipcode: scraper.filtered_path}, args.combined_output)
+            print(f"Combined data saved to: {args.combined_output}")
         sys.exit(0)
     else:
         print("\nError: Failed to scrape electricity rate data")
@@ -0,0 +1,44 @@
+import importlib
+
+import pandas as pd
+import pytest
+
+
+EXPORT_HEADER = 'Supplier,Price,Term Length,Service Type,Type,Monthly Fee,Cancellation Fee,Discounts/Incentives Available,More info\n'
+
+
+@pytest.fixture
+def scraper_module(tmp_path, monkeypatch):
+    # The module creates output/ and its log file in the working directory on import
+    monkeypatch.chdir(tmp_path)
+    return importlib.import_module('pagasswitch_export_scraper')
+
+
+def test_read_export_csv_reads_blank_column_as_text(scraper_module, tmp_path):
+    csv_path = tmp_path / 'export.csv'
+    csv_path.write_text(EXPORT_HEADER + 'A,0.5,12,Residential,Fixed,No,,No,\n')
+
+    df = scraper_module.read_export_csv(str(csv_path))
+
+    assert df['More info'].str.contains('for new customers', na=False).tolist() == [False]
+    assert df['More info'].fillna('').tolist() == ['']
+
+
+def test_process_csv_file_with_blank_more_info(scraper_module, tmp_path):
+    csv_path = tmp_path / 'export.csv'
+    csv_path.write_text(
+        EXPORT_HEADER
+        + 'A,0.5,12,Residential,Fixed,No,,No,\n'
+        + 'B,0.4,6,Residential,Fixed,No,,No,\n'
+    )
+    scraper = scraper_module.PAGasSwitchExportScraper(
+        output_dir=str(tmp_path), download_dir=str(tmp_path), driver=object()
+    )
+    scraper._latest_csv_path = str(csv_path)
+
+    assert scraper.process_csv_file('19348')
+
+    result = pd.read_csv(scraper.filtered_path, keep_default_na=False)
+    assert result['Supplier'].tolist() == ['B', 'A']
+    assert result['New Customers only'].tolist() == ['No', 'No']
+    assert result['More info'].tolist() == ['', '']